@@ -0,0 +1,80 @@
+"""
+Resource assignment at scale: 20 photographers, 1M existing bookings.
+
+Fills each resource's BookingIndex with back-to-back shoots over the next
+years (bookings added in start order, as a restore would), then times
+assign_resource() for random new slots. If assignment is
+O(resources x log n), the time per call should barely move between the
+sizes below.
+
+    python bench/assign_resources.py [resources] [bookings] [samples]
+"""
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("PORT", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import bot  # noqa: E402
+
+RESOURCE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+BOOKING_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+SAMPLES = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+CLUSTERS = ["central-london", "north-london", "south-london", "manchester", None]
+START = datetime(2027, 1, 1, 8)
+
+
+def fill(bookings: int):
+    bot.RESOURCES.clear()
+    for i in range(RESOURCE_COUNT):
+        bot.RESOURCES[f"p{i}"] = bot.Resource(f"p{i}", hours=["08:00", "22:00"] if i % 4 else None)
+
+    per_resource = bookings // RESOURCE_COUNT
+    rng = random.Random(1)
+    for res in bot.RESOURCES.values():
+        slot = START
+        for _ in range(per_resource):
+            length = timedelta(hours=rng.choice((1, 2, 3)))
+            res.index.add({
+                "start_dt": slot, "end_dt": slot + length,
+                "cluster": rng.choice(CLUSTERS), "type": "lifestyle",
+            })
+            slot += length + timedelta(minutes=rng.choice((0, 30, 60, 240)))
+    # how far the calendars reach, so probes land inside the busy period
+    return min(res.index._starts[-1] for res in bot.RESOURCES.values()) - START
+
+
+def probe(span: timedelta):
+    rng = random.Random(2)
+    calls = []
+    for _ in range(SAMPLES):
+        start = START + timedelta(minutes=30 * rng.randrange(int(span.total_seconds() // 1800)))
+        calls.append({
+            "type": rng.choice(("lifestyle", "matchday")),
+            "start_dt": start, "end_dt": start + timedelta(hours=2),
+            "cluster": rng.choice(CLUSTERS),
+        })
+    started = time.perf_counter()
+    assigned = sum(bot.assign_resource(b)[0] is not None for b in calls)
+    return (time.perf_counter() - started) / SAMPLES * 1e6, assigned
+
+
+def main():
+    for bookings in (BOOKING_COUNT // 100, BOOKING_COUNT // 10, BOOKING_COUNT):
+        started = time.perf_counter()
+        span = fill(bookings)
+        build = time.perf_counter() - started
+        per_call, assigned = probe(span)
+        print(
+            f"{RESOURCE_COUNT} resources, {bookings:>9,} bookings: "
+            f"{per_call:7.1f}us per assign_resource ({assigned}/{SAMPLES} placed, "
+            f"build {build:.1f}s, calendar span {span.days} days)"
+        )
+
+
+if __name__ == "__main__":
+    main()
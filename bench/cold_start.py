@@ -0,0 +1,99 @@
+"""
+Cold start: time from spawning the bot to its first reply.
+
+Serves one /start from scaling.py's fake Bot API, then starts the bot
+the way render.yaml does (bytecode precompiled, "import bot; bot.main()")
+and times from spawning the process to the fake server receiving the
+first sendMessage. Each run is a fresh process with its own copy of
+data/. The bot's own startup breakdown (logged at INFO) is printed for
+the last run.
+
+    python bench/cold_start.py [--runs 5] [--text /start] [--api-latency-ms 0]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from scaling import REPO, FakeBotApi, _message
+
+
+def run(text: str, latency_ms: float):
+    """(ms from spawn to first reply, the bot's startup log lines)."""
+    api = FakeBotApi([dict(_message(1000, text), update_id=1)], latency_ms)
+    workdir = tempfile.mkdtemp(prefix="bench-cold-")
+    shutil.copytree(os.path.join(REPO, "data"), os.path.join(workdir, "data"))
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO,
+        "TELEGRAM_TOKEN": "1:bench",
+        "TELEGRAM_API_URL": api.url,
+        "PORT": "0",
+        "LOG_LEVEL": "INFO",
+    }
+    spawned = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import bot; bot.main()"],
+        cwd=workdir, env=env, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        deadline = spawned + 60
+        while not api.sent and time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f"bot exited with {proc.returncode}:\n{proc.stderr.read()}")
+            time.sleep(0.001)
+        with api.lock:
+            first = api.sent[0][0]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            _, logs = proc.communicate(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            _, logs = proc.communicate()
+        api.server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    startup = []
+    for line in logs.splitlines():
+        try:
+            msg = json.loads(line).get("msg", "")
+        except ValueError:
+            continue
+        if msg.startswith(("Startup ", "First update answered", "Background warm-up")):
+            startup.append(msg)
+    return (first - spawned) * 1000, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--api-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    # render.yaml's buildCommand
+    subprocess.run([sys.executable, "-m", "compileall", "-q", os.path.join(REPO, "bot.py")], check=True)
+
+    times = []
+    for i in range(args.runs):
+        ms, startup = run(args.text, args.api_latency_ms)
+        times.append(ms)
+        print(f"run {i + 1}: spawn to first reply {ms:7.1f}ms", flush=True)
+    print(
+        f"{args.text!r}, API latency {args.api_latency_ms}ms: "
+        f"median {statistics.median(times):.1f}ms, min {min(times):.1f}ms, max {max(times):.1f}ms"
+    )
+    print("last run, as logged by the bot:")
+    for msg in startup:
+        print("  " + msg)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Logging under load: event-loop cost of logging with a slow log sink.
+
+Runs CONCURRENCY simulated updates on one asyncio loop. Each one logs a few
+INFO records with arguments plus one exception with a traceback, the way a
+handler does. The sink sleeps SINK_MS per write (a slow pipe / log shipper).
+
+Compares a synchronous StreamHandler on the loop with bot.setup_logging()
+(queue + listener thread), and checks which thread formatted the records.
+
+    python bench/logging_load.py [updates] [sink_ms]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("PORT", "0")
+os.environ.setdefault("LOG_SAMPLE_RATE", "1")
+
+import bot  # noqa: E402
+
+UPDATES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+SINK_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+CONCURRENCY = 50
+
+
+class SlowSink:
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, text):
+        time.sleep(SINK_MS / 1000)
+        self.lines += text.count("\n")
+
+    def flush(self):
+        pass
+
+
+class ThreadSpyFormatter(bot.JsonFormatter):
+    threads = set()
+    with_exc = 0
+
+    def format(self, record):
+        ThreadSpyFormatter.threads.add(threading.current_thread().name)
+        out = super().format(record)
+        ThreadSpyFormatter.with_exc += '"exc"' in out
+        return out
+
+
+async def fake_update(log, i, latencies):
+    started = time.perf_counter()
+    log.info("handled %s for %d", "book_time", i, extra={"user_id": i, "handler": "book_time"})
+    log.info("Sort Code: 12-34-56 Account: 12345678 for user %d", i)
+    try:
+        raise ValueError(f"bad input {i}")
+    except ValueError:
+        log.exception("handler failed for %d", i)
+    log.info("latency", extra={"latency_ms": 1.0, "sample": True})
+    await asyncio.sleep(0)
+    latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def drive(log):
+    latencies = []
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i):
+        async with sem:
+            await fake_update(log, i, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(UPDATES)))
+    return latencies, time.perf_counter() - started
+
+
+def report(name, latencies, wall, sink, spy):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<22} per update p50 {statistics.median(latencies):7.3f}ms  p99 {p99:7.3f}ms  "
+        f"loop wall {wall * 1000:8.1f}ms  lines {sink.lines:5d}  "
+        f"formatted on {sorted(spy.threads)}  tracebacks {spy.with_exc}"
+    )
+
+
+def main():
+    root = logging.getLogger()
+    log = logging.getLogger("bench")
+    bot.stop_logging()
+
+    # 1) synchronous handler on the event loop
+    sink = SlowSink()
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(ThreadSpyFormatter())
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+    latencies, wall = asyncio.run(drive(log))
+    report("sync StreamHandler", latencies, wall, sink, ThreadSpyFormatter)
+
+    # 2) the bot's pipeline; swap the spy formatter onto its stream handler
+    ThreadSpyFormatter.threads, ThreadSpyFormatter.with_exc = set(), 0
+    sink = SlowSink()
+    listener = bot.setup_logging(stream=sink)
+    listener.handlers[0].setFormatter(ThreadSpyFormatter())
+    latencies, wall = asyncio.run(drive(log))
+    listener.stop()  # drains the queue
+    report("queue + listener", latencies, wall, sink, ThreadSpyFormatter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Multi-process scaling: booking throughput at 1, 2, 4 and 8 workers.
+
+Starts a fake Bot API server in this process and serves a scripted run
+in which USERS clients each go through a full /book conversation (8
+updates each). Then it starts the bot against that server, once per worker
+count, with TELEGRAM_API_URL pointing at it, and times from the first
+reply to the last admin notification. 1 worker is the plain
+single-process mode; more workers use the ingress + shared-store mode.
+
+--api-latency-ms makes every Bot API call take that long, like a real
+round trip to Telegram; a worker handles its updates one at a time, so
+that is where extra workers pay off even before CPU runs out. On a
+machine with few cores the fake server and the bot compete for CPU, so
+read the numbers with the core count (printed first).
+
+    python bench/scaling.py [--users 300] [--workers 1 2 4 8] [--api-latency-ms 0]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ADMIN = 999
+
+
+def _message(uid: int, text: str, chat: int = None) -> dict:
+    msg = {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": chat or uid, "type": "private"},
+        "from": {"id": uid, "is_bot": False, "first_name": f"U{uid}", "username": f"u{uid}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"message": msg}
+
+
+def _button(uid: int, data: str) -> dict:
+    return {"callback_query": {
+        "id": str(uid),
+        "from": {"id": uid, "is_bot": False, "first_name": f"U{uid}"},
+        "chat_instance": "1",
+        "data": data,
+        "message": {"message_id": 2, "date": 0, "chat": {"id": uid, "type": "private"}, "text": "q"},
+    }}
+
+
+def script(users: int) -> list:
+    """Interleaved booking conversations, one step for every user at a time."""
+    steps = ["/book", "Name", "@ig", "10/12/2027", "14:00", "Camden", ("button", "type_lifestyle"), "2"]
+    updates = []
+    for step in steps:
+        for uid in range(1000, 1000 + users):
+            updates.append(_button(uid, step[1]) if isinstance(step, tuple) else _message(uid, step))
+    for i, update in enumerate(updates):
+        update["update_id"] = i + 1
+    return updates
+
+
+class FakeBotApi:
+    """Just enough of the Bot API for the booking flow, recording sends."""
+
+    def __init__(self, updates: list, latency_ms: float):
+        self.updates = updates
+        self.latency = latency_ms / 1000
+        self.sent = []
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                method = self.path.rsplit("/", 1)[1]
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                body = json.loads(raw) if raw.startswith("{") else dict(parse_qsl(raw))
+                result = api.call(method, body)
+                out = json.dumps({"ok": True, "result": result}).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(out)))
+                    self.end_headers()
+                    self.wfile.write(out)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # a long poll the bot cancelled while shutting down
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/bot"
+
+    def call(self, method: str, body: dict):
+        if method == "getUpdates":
+            offset = int(body.get("offset") or 0)
+            batch = [u for u in self.updates if u["update_id"] >= offset][:100]
+            if not batch:
+                time.sleep(min(float(body.get("timeout") or 0), 0.5))
+            return batch
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        if method in ("sendMessage", "editMessageText"):
+            with self.lock:
+                self.sent.append((time.perf_counter(), str(body.get("chat_id")), body.get("text") or ""))
+            return {"message_id": 5, "date": 0, "chat": {"id": int(body.get("chat_id") or 1), "type": "private"}}
+        return True
+
+    def admin_notifications(self) -> list:
+        with self.lock:
+            return [t for t, chat, text in self.sent if chat == str(ADMIN) and "/travel" in text]
+
+
+def run(workers: int, users: int, latency_ms: float) -> str:
+    api = FakeBotApi(script(users), latency_ms)
+    workdir = tempfile.mkdtemp(prefix="bench-scaling-")
+    shutil.copytree(os.path.join(REPO, "data"), os.path.join(workdir, "data"))
+    env = {
+        **os.environ,
+        "TELEGRAM_TOKEN": "1:bench",
+        "TELEGRAM_API_URL": api.url,
+        "ADMIN_CHAT_ID": str(ADMIN),
+        "BOT_WORKERS": str(workers),
+        "PORT": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+    proc = subprocess.Popen([sys.executable, os.path.join(REPO, "bot.py")], cwd=workdir, env=env)
+    try:
+        deadline = time.perf_counter() + 600
+        while len(api.admin_notifications()) < users and time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                return f"workers={workers}: bot exited with {proc.returncode}"
+            time.sleep(0.1)
+        done = api.admin_notifications()
+        with api.lock:
+            first = min(t for t, _, _ in api.sent)
+        elapsed = max(done) - first
+        updates = users * 8
+        return (
+            f"workers={workers}: {len(done)}/{users} bookings, {updates} updates in "
+            f"{elapsed:6.2f}s = {updates / elapsed:6.0f} updates/s"
+        )
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        api.server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--api-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs, {args.users} users, API latency {args.api_latency_ms}ms")
+    for workers in args.workers:
+        print(run(workers, args.users, args.api_latency_ms), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+/find over a large booking history: build cost, memory and query latency.
+
+Writes ROWS confirmed bookings to a temporary bookings CSV (names drawn
+from small pools, so common names match thousands of rows), then indexes
+it with load_search_history() in a background thread the way warm_up
+does, while an asyncio loop ticks every 5ms to measure how long the
+event loop is held up meanwhile. Then times SEARCH_INDEX.search() for
+common, exact, misspelt and rare queries.
+
+    python bench/search_history.py [rows] [repeats]
+"""
+import os
+import sys
+import csv
+import time
+import random
+import asyncio
+import resource
+import tempfile
+import threading
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("PORT", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import bot  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+REPEATS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+FIRST = [
+    "olivia", "amelia", "isla", "ava", "mia", "ivy", "lily", "sophia", "grace", "freya",
+    "noah", "oliver", "george", "leo", "arthur", "muhammad", "harry", "oscar", "jack", "james",
+    "charlie", "theo", "jacob", "alfie", "thomas", "william", "henry", "joshua", "ethan", "daniel",
+    "chloe", "emily", "ella", "evie", "poppy", "jessica", "sophie", "ruby", "hannah", "sarah",
+]
+LAST = [
+    "smith", "jones", "taylor", "brown", "williams", "wilson", "johnson", "davies", "patel",
+    "robinson", "wright", "thompson", "evans", "walker", "white", "roberts", "green", "hall",
+    "thomas", "clarke", "jackson", "wood", "harris", "edwards", "turner", "martin", "cooper",
+    "hill", "ward", "hughes", "moore", "clark", "king", "harrison", "lewis", "baker", "lee",
+    "allen", "morris", "khan", "scott", "watson", "davis", "parker", "james", "bennett", "young",
+    "phillips", "richardson", "mitchell", "bailey", "carter", "cook", "singh", "shaw", "bell",
+    "collins", "morgan", "kelly", "begum", "miller", "cox", "hussain", "marshall", "simpson",
+    "price", "anderson", "adams", "wilkinson", "ali", "ahmed", "foster", "ellis", "murphy",
+    "chapman", "mason", "gray", "richards", "webb", "griffiths", "hunt", "palmer", "campbell",
+    "holmes", "mills", "rogers", "barnes", "knight", "matthews", "barker", "powell", "stevens",
+    "kaur", "fisher", "butler", "dixon", "russell", "harvey", "pearson", "graham",
+]
+PLACES = [
+    "Camden", "Hackney", "Islington", "Brixton", "Peckham", "Shoreditch", "Stratford",
+    "Croydon", "Wembley", "Tottenham", "Clapham", "Greenwich", "Lewisham", "Ealing",
+    "Hammersmith", "Walthamstow", "Manchester", "Salford", "Birmingham", "Leeds",
+    "Hyde Park", "Canary Wharf", "King's Cross", "Notting Hill", "Battersea Park",
+]
+QUERIES = {
+    "common first name": ["olivia", "jack", "sophie"],
+    "full name": ["olivia smith", "jack patel", "sophie hughes"],
+    "instagram handle": ["@olivia.smith123", "@jackpatel_77", "@sophie.h"],
+    "misspelt name": ["olvia smth", "jak patell", "sofie hughs"],
+    "location": ["camden", "canary wharf"],
+    "no match": ["zzyzx qwv"],
+}
+
+
+def write_csv(path: str):
+    rng = random.Random(1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        out = csv.writer(f, lineterminator="\n")
+        for i in range(ROWS):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            sep = rng.choice((".", "_", ""))
+            out.writerow([
+                "2026-01-01T10:00:00", 100000 + i, f"{first}{rng.randrange(1000)}",
+                f"{first.title()} {last.title()}", f"@{first}{sep}{last}{rng.randrange(100)}",
+                "10/12/2027", "14:00", rng.choice(PLACES), "lifestyle", 2, "", 200, 20, 220,
+                f"2027-12-10T14:00:{i % 60:02d}", "2027-12-10T16:00:00",
+            ])
+
+
+async def build_with_ticks():
+    """load_search_history on a thread; return (seconds, worst tick delay ms)."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    build = loop.run_in_executor(None, bot.load_search_history)
+    worst = 0.0
+    while not build.done():
+        before = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, (time.perf_counter() - before) * 1000 - 5)
+    await build
+    return time.perf_counter() - started, worst
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench-search-")
+    bot.BOOKINGS_CSV = os.path.join(workdir, "bookings.csv")
+    started = time.perf_counter()
+    write_csv(bot.BOOKINGS_CSV)
+    size = os.path.getsize(bot.BOOKINGS_CSV)
+    print(f"{ROWS:,} rows, {size / 2**20:.0f} MB CSV written in {time.perf_counter() - started:.1f}s")
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    seconds, worst_tick = asyncio.run(build_with_ticks())
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"index built in {seconds:.1f}s on {threading.active_count()} threads, "
+        f"peak RSS +{(rss_after - rss_before) / 1024:.0f} MB, "
+        f"worst event-loop delay meanwhile {worst_tick:.1f}ms"
+    )
+
+    for kind, queries in QUERIES.items():
+        times = []
+        for _ in range(REPEATS):
+            for query in queries:
+                t = time.perf_counter()
+                results = bot.SEARCH_INDEX.search(query)
+                times.append((time.perf_counter() - t) * 1000)
+        top = results[0][1]["name"] if results else "-"
+        print(
+            f"{kind:<18} p50 {statistics.median(times):7.2f}ms  max {max(times):7.2f}ms  "
+            f"(last query {queries[-1]!r}: {len(results)} results, top {top})"
+        )
+    os.remove(bot.BOOKINGS_CSV)
+    os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
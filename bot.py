@@ -1,31 +1,139 @@
+import time as _time
+
+# Taken before anything else loads – startup phases are measured from here
+_BOOT_STARTED = _time.perf_counter()
+
 import os
+import re
+import csv
+import gzip
+import hmac
+import json
+import math
+import queue
+import atexit
+import base64
+import asyncio
+import sqlite3
+import bisect
+import random
+import hashlib
+import contextlib
 import logging
-from datetime import datetime, date, time, timedelta
+import functools
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import signal
+import sys
+from array import array
+from collections import Counter
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import datetime, date, time, timedelta
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import parse_qs, unquote
+
+
+# --- Startup timing ---
+STARTUP_PHASES = []
+_LAST_PHASE = _BOOT_STARTED
+
+
+def mark_startup_phase(name: str):
+    """Record how long the startup step that just finished took (ms)."""
+    global _LAST_PHASE
+    now = _time.perf_counter()
+    STARTUP_PHASES.append((name, (now - _LAST_PHASE) * 1000))
+    _LAST_PHASE = now
 
-# --- Healthcheck web server for Render ---
-class Health(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b"OK")
 
-    def do_HEAD(self):
-        self.send_response(200)
-        self.end_headers()
+def process_uptime_ms() -> float:
+    """Milliseconds since the OS started this process (Linux), else since import."""
+    try:
+        with open("/proc/self/stat") as f:
+            # fields after the ")" of the command name start at field 3;
+            # field 22 is the start time in clock ticks since boot
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError, AttributeError):
+        return (_time.perf_counter() - _BOOT_STARTED) * 1000
+
+
+# time the interpreter spent before this module started running
+_INTERPRETER_MS = max(process_uptime_ms() - (_time.perf_counter() - _BOOT_STARTED) * 1000, 0.0)
+mark_startup_phase("stdlib imports")
+# --- end startup timing ---
+
+# --- Healthcheck + admin API web server for Render ---
+# asyncio server on its own thread/loop so slow clients can't hold up the
+# health check. Extra routes are registered further down (see ADMIN API);
+# anything they don't claim answers "OK".
+HTTP_ROUTES = {}  # path prefix -> handler(request) -> (status, headers, body)
+_HTTP_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 401: "Unauthorized",
+                 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+async def _read_request(reader):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    method, target, _ = request_line.split(" ", 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    path, _, query = target.partition("?")
+    return {"method": method.upper(), "path": path, "query": query, "headers": headers}
+
+
+def _route(request):
+    for prefix, handler in list(HTTP_ROUTES.items()):
+        if request["path"].startswith(prefix):
+            return handler(request)
+    return 200, {"Content-Type": "text/plain"}, b"OK"
+
+
+async def _handle_http(reader, writer):
+    try:
+        request = await asyncio.wait_for(_read_request(reader), 10)
+        try:
+            status, headers, body = _route(request)
+        except Exception:
+            logging.getLogger(__name__).exception("http handler failed")
+            status, headers, body = 500, {"Content-Type": "text/plain"}, b"error"
+        head = [f"HTTP/1.1 {status} {_HTTP_REASONS.get(status, '')}",
+                f"Content-Length: {len(body)}", "Connection: close"]
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if request["method"] != "HEAD" and status != 304:
+            writer.write(body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError, ValueError, UnicodeError):
+        pass
+    finally:
+        writer.close()
 
 
 def start_healthcheck():
     port = int(os.getenv("PORT", "10000"))
-    server = HTTPServer(("0.0.0.0", port), Health)
-    server.serve_forever()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(asyncio.start_server(_handle_http, "0.0.0.0", port))
+    loop.run_forever()
+
 
+# Set for worker processes in multi-process mode (see MULTI-PROCESS); the
+# ingress process owns the port, so workers don't start the server
+WORKER_SHARD = int(os.environ["BOT_SHARD"]) if "BOT_SHARD" in os.environ else None
 
-threading.Thread(target=start_healthcheck, daemon=True).start()
+if WORKER_SHARD is None:
+    threading.Thread(target=start_healthcheck, daemon=True).start()
+mark_startup_phase("health server")
 # --- end health server ---
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -36,7 +144,11 @@ from telegram.ext import (
     filters,
 )
 
+mark_startup_phase("telegram import")
+
 TOKEN = os.getenv("TELEGRAM_TOKEN")
+# Point at a self-hosted Bot API server (or bench/scaling.py's fake one)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID")
 
 if ADMIN_CHAT_ID:
@@ -47,10 +159,159 @@ if ADMIN_CHAT_ID:
 else:
     ADMIN_CHAT_ID = None
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+# Travel fee suggestions (admin still sets the final fee with /travel)
+LOCATIONS_FILE = os.getenv("LOCATIONS_FILE", "data/uk_locations.csv")
+HOME_BASE = os.getenv("HOME_BASE", "London")
+
+# Shoot tiers, member discount, peak dates and travel-fee rules (hot-reloaded;
+# /reprice applies changes to pending bookings)
+PRICING_FILE = os.getenv("PRICING_FILE", "data/pricing.json")
+
+# Clash checks: travel time between location clusters + setup buffer.
+# Unknown locations fall back to the old flat 3h gap (150 + 30 minutes).
+TRAVEL_TIMES_FILE = os.getenv("TRAVEL_TIMES_FILE", "data/travel_times.csv")
+SHOOT_BUFFER_MINUTES = int(os.getenv("SHOOT_BUFFER_MINUTES", "30"))
+UNKNOWN_TRAVEL_MINUTES = int(os.getenv("UNKNOWN_TRAVEL_MINUTES", "150"))
+# Longest lifestyle shoot a client can book (also bounds the clash index scan)
+MAX_SHOOT_HOURS = int(os.getenv("MAX_SHOOT_HOURS", "12"))
+
+# Photographers / crews; without this file everything shares one calendar
+RESOURCES_FILE = os.getenv("RESOURCES_FILE", "data/resources.json")
+# Admin blackout periods (/block, /unblock)
+BLOCKS_FILE = os.getenv("BLOCKS_FILE", "data/blocks.json")
+
+# Pending + confirmed bookings survive restarts via this file
+STATE_FILE = os.getenv("STATE_FILE", "data/state.json")
+# How long shutdown waits for running handlers before flushing state anyway
+SHUTDOWN_DEADLINE_SECONDS = float(os.getenv("SHUTDOWN_DEADLINE_SECONDS", "20"))
+
+# Read-only JSON API on the health port (/api/...); off unless a token is set
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+
+# Multi-process mode: BOT_WORKERS > 1 runs an ingress process that hands
+# updates to that many workers, sharded by user_id. Workers share bookings
+# through STORE_FILE (SQLite) instead of STATE_FILE.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+STORE_FILE = os.getenv("STORE_FILE", "data/bookings.db")
+
+# Member verification (list is hot-reloaded when the file changes)
+MEMBERS_FILE = os.getenv("MEMBERS_FILE", "data/members.txt")
+MEMBERS_RELOAD_SECONDS = int(os.getenv("MEMBERS_RELOAD_SECONDS", "30"))
+MEMBERS_BLOOM_THRESHOLD = int(os.getenv("MEMBERS_BLOOM_THRESHOLD", "1000000"))
+# How long a booking waits for the member list still loading after a start
+MEMBERS_LOAD_WAIT_SECONDS = float(os.getenv("MEMBERS_LOAD_WAIT_SECONDS", "10"))
+
+# Logging: JSON lines written by a background listener thread
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+
+# ---------- LOGGING ---------- #
+
+# Loggers whose INFO output is per-request noise (e.g. every getUpdates poll)
+_SAMPLED_LOGGERS = ("httpx", "telegram")
+_LOG_CONTEXT_FIELDS = ("user_id", "handler", "state", "latency_ms")
+_REDACT_PATTERNS = [
+    # the bot token is part of every Bot API URL httpx logs
+    (re.compile(r"/bot[^/\s]+/"), "/bot[token]/"),
+    (re.compile(r"\b\d{2}-\d{2}-\d{2}\b"), "[sort-code]"),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"), "[email]"),
+    (re.compile(r"(Name|Instagram|Sort Code|Account):[^\n]*"), r"\1: [redacted]"),
+]
+
+
+def redact(text: str) -> str:
+    """Strip bank details and other personal data from a log message."""
+    for pattern, replacement in _REDACT_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with context fields and PII redacted."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        for field in _LOG_CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if WORKER_SHARD is not None:
+            entry["shard"] = WORKER_SHARD
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = redact(record.exc_text)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep LOG_SAMPLE_RATE of high-volume INFO records; never drops warnings."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        if getattr(record, "sample", False) or record.name.startswith(_SAMPLED_LOGGERS):
+            return random.random() < self.rate
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records untouched. The stock prepare()
+    formats the message on the calling thread (the event loop) and drops
+    exc_info; the queue here is in-process, so nothing needs pickling.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(stream=None) -> QueueListener:
+    """
+    Route all logging through a queue so handlers only enqueue records;
+    interpolation, tracebacks, redaction and stream I/O all happen on the
+    listener thread.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    listener.start()
+    return listener
+
+
+LOG_LISTENER = setup_logging()
+_LOGGING_STOPPED = False
+
+
+def stop_logging():
+    """Drain queued log records and stop the listener (safe to call twice)."""
+    global _LOGGING_STOPPED
+    if not _LOGGING_STOPPED:
+        _LOGGING_STOPPED = True
+        LOG_LISTENER.stop()
+
+
+atexit.register(stop_logging)
 logger = logging.getLogger("Invalid8thBot")
 
 (
@@ -64,9 +325,11 @@ logger = logging.getLogger("Invalid8thBot")
     MATCHDAY_PLAYERS,
 ) = range(8)
 
+BOOKINGS_CSV = "data/bookings.csv"
+
 # Pending bookings by user_id
 BOOKINGS = {}
-# Confirmed bookings list (used for clash checks)
+# Confirmed bookings list (clash checks go through each resource's index)
 CONFIRMED_BOOKINGS = []
 
 
@@ -90,41 +353,1883 @@ def parse_time_str(time_text: str) -> time:
     return datetime.strptime(time_text, "%H:%M").time()
 
 
-def check_time_spacing(start_dt: datetime, end_dt: datetime, other_bookings):
+# ---------- LOCATIONS ---------- #
+
+# Outward code with optional inward code, e.g. "se7" or "se7 8bl"
+_POSTCODE_RE = re.compile(r"\b([a-z]{1,2}\d[a-z\d]?)(\s*\d[a-z]{2})?\b")
+_MAX_LOCATION_WORDS = 12
+
+_GAZETTEER = None
+
+
+def normalise_location(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = (text or "").lower().replace("&", " and ")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+class Gazetteer:
+    """
+    Offline UK place lookup over sorted key arrays (binary search, no scans).
+    Area names and postcodes are kept apart so a stray word like "m" or "e"
+    in free text is never read as a postcode area.
+    """
+
+    def __init__(self, rows):
+        names, postcodes = {}, {}
+        for row in rows:
+            target = postcodes if row["kind"] == "postcode" else names
+            target[normalise_location(row["name"])] = (
+                row["name"],
+                float(row["lat"]),
+                float(row["lon"]),
+                row.get("cluster") or None,
+            )
+        self._name_keys = sorted(names)
+        self._name_vals = [names[k] for k in self._name_keys]
+        self._postcode_keys = sorted(postcodes)
+        self._postcode_vals = [postcodes[k] for k in self._postcode_keys]
+
+    def __len__(self):
+        return len(self._name_keys) + len(self._postcode_keys)
+
+    @staticmethod
+    def _find(keys, vals, key):
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return vals[i]
+        return None
+
+    def _find_postcode(self, district: str, full: bool):
+        # "w1a" -> "w1"; full postcodes may also fall back to the area ("se")
+        candidates = [district, district.rstrip("abcdefghijklmnopqrstuvwxyz")]
+        if full:
+            candidates.append(re.sub(r"\d.*", "", district))
+        for key in candidates:
+            hit = self._find(self._postcode_keys, self._postcode_vals, key)
+            if hit:
+                return hit
+        return None
+
+    def lookup(self, normalised: str):
+        """Return (name, lat, lon, cluster) for the best match in normalised text, or None."""
+        postcodes = _POSTCODE_RE.findall(normalised)
+
+        # 1) full postcodes are the most precise thing a client can send
+        for district, inward in postcodes:
+            if inward:
+                hit = self._find_postcode(district, full=True)
+                if hit:
+                    return hit
+
+        # 2) longest run of whole words ("kensington gardens" beats "kensington")
+        words = normalised.split()[:_MAX_LOCATION_WORDS]
+        for length in range(len(words), 0, -1):
+            for start in range(len(words) - length + 1):
+                key = " ".join(words[start:start + length])
+                hit = self._find(self._name_keys, self._name_vals, key)
+                if hit:
+                    return hit
+
+        # 3) bare outward codes ("SE7") only match a known district
+        for district, inward in postcodes:
+            if not inward:
+                hit = self._find_postcode(district, full=False)
+                if hit:
+                    return hit
+        return None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Load the bundled gazetteer on first use."""
+    global _GAZETTEER
+    if _GAZETTEER is None:
+        try:
+            with open(LOCATIONS_FILE, newline="", encoding="utf-8") as f:
+                _GAZETTEER = Gazetteer(csv.DictReader(f))
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Failed to load locations file: %s", e)
+            _GAZETTEER = Gazetteer([])
+    return _GAZETTEER
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in miles."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 3958.8 * math.asin(math.sqrt(a))
+
+
+@functools.lru_cache(maxsize=1)
+def home_base():
+    """(lat, lon) of HOME_BASE – either "lat,lon" or a gazetteer place name."""
+    try:
+        lat, lon = (float(p) for p in HOME_BASE.split(","))
+        return lat, lon
+    except ValueError:
+        pass
+    hit = get_gazetteer().lookup(normalise_location(HOME_BASE))
+    if hit is None:
+        logger.warning("HOME_BASE %r not recognised, using central London", HOME_BASE)
+        return 51.5074, -0.1278
+    return hit[1], hit[2]
+
+
+def suggest_travel_fee(distance_miles: float) -> int:
+    """Suggested travel fee in £ for a distance from home base."""
+    return get_pricing().travel_fee(distance_miles)
+
+
+@functools.lru_cache(maxsize=4096)
+def resolve_location(normalised: str):
+    """
+    Match a normalised location against the gazetteer.
+    Returns {"match", "cluster", "distance_miles", "suggested_fee"} or None.
+    Memoised per normalised text – treat the result as read-only.
+    """
+    hit = get_gazetteer().lookup(normalised)
+    if hit is None:
+        return None
+    name, lat, lon, cluster = hit
+    distance = haversine_miles(*home_base(), lat, lon)
+    return {
+        "match": name,
+        "cluster": cluster,
+        "distance_miles": round(distance, 1),
+        "suggested_fee": suggest_travel_fee(distance),
+    }
+
+
+def travel_fee_hint(booking: dict) -> str:
+    """Admin notification line with the suggested travel fee."""
+    if booking.get("suggested_travel_fee") is None:
+        return "Suggested travel: location not recognised\n"
+    return (
+        f"Suggested travel: £{booking['suggested_travel_fee']} "
+        f"({booking['location_match']}, ~{booking['distance_miles']} mi from base)\n"
+    )
+
+
+def travel_fee_arg(booking: dict) -> str:
+    """Amount to pre-fill in the /travel hint."""
+    fee = booking.get("suggested_travel_fee")
+    return "<amount>" if fee is None else str(fee)
+
+
+# ---------- CLASH CHECKS ---------- #
+
+_TRAVEL_TIMES = None
+
+
+class TravelTimes:
+    """
+    Precomputed travel minutes between location clusters.
+    The matrix is symmetric, so only the upper triangle is kept, packed
+    into a flat unsigned-short array.
+    """
+
+    _MISSING = 0xFFFF
+
+    def __init__(self, rows):
+        pairs = [(r["from"], r["to"], int(r["minutes"])) for r in rows]
+        names = sorted({name for a, b, _ in pairs for name in (a, b)})
+        self._index = {name: i for i, name in enumerate(names)}
+        n = len(names)
+        self._minutes = array("H", [self._MISSING]) * (n * (n + 1) // 2)
+        for a, b, minutes in pairs:
+            self._minutes[self._slot(self._index[a], self._index[b])] = minutes
+
+    @staticmethod
+    def _slot(i: int, j: int) -> int:
+        if i > j:
+            i, j = j, i
+        return j * (j + 1) // 2 + i
+
+    def minutes(self, a, b):
+        """Travel minutes between two clusters, or None if either is unknown."""
+        i = self._index.get(a)
+        j = self._index.get(b)
+        if i is None or j is None:
+            return None
+        value = self._minutes[self._slot(i, j)]
+        return None if value == self._MISSING else value
+
+
+def get_travel_times() -> TravelTimes:
+    """Load the travel-time matrix on first use."""
+    global _TRAVEL_TIMES
+    if _TRAVEL_TIMES is None:
+        try:
+            with open(TRAVEL_TIMES_FILE, newline="", encoding="utf-8") as f:
+                _TRAVEL_TIMES = TravelTimes(csv.DictReader(f))
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Failed to load travel times: %s", e)
+            _TRAVEL_TIMES = TravelTimes([])
+    return _TRAVEL_TIMES
+
+
+def required_gap_minutes(cluster_a, cluster_b) -> int:
+    """Minutes needed between two shoots: travel time plus setup buffer."""
+    travel = get_travel_times().minutes(cluster_a, cluster_b)
+    if travel is None:
+        travel = UNKNOWN_TRAVEL_MINUTES
+    return travel + SHOOT_BUFFER_MINUTES
+
+
+class BookingIndex:
+    """
+    Bookings kept sorted by start time so clash checks only look at
+    neighbours (bisect) instead of scanning every booking.
     """
-    Check overlap and <3h gaps vs other bookings.
-    Returns dict: {"overlap": bool, "close_gap": bool, "nearest": booking_or_None}
+
+    def __init__(self):
+        self._starts = []
+        self._items = []
+        # longest booking held – bounds how far back an overlap can start;
+        # a count per length lets remove() shrink it without a rescan
+        self._max_len = timedelta(0)
+        self._lengths = Counter()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def add(self, booking: dict):
+        start_dt = booking.get("start_dt")
+        end_dt = booking.get("end_dt")
+        if not start_dt or not end_dt:
+            return
+        i = bisect.bisect_right(self._starts, start_dt)
+        self._starts.insert(i, start_dt)
+        self._items.insert(i, booking)
+        self._lengths[end_dt - start_dt] += 1
+        self._max_len = max(self._max_len, end_dt - start_dt)
+
+    def remove(self, booking: dict):
+        start_dt = booking.get("start_dt")
+        if not start_dt:
+            return
+        lo = bisect.bisect_left(self._starts, start_dt)
+        hi = bisect.bisect_right(self._starts, start_dt)
+        for i in range(lo, hi):
+            if self._items[i] is booking:
+                del self._starts[i]
+                del self._items[i]
+                length = booking["end_dt"] - start_dt
+                self._lengths[length] -= 1
+                if not self._lengths[length]:
+                    del self._lengths[length]
+                    # last booking of the longest length gone – shrink the window
+                    if length == self._max_len:
+                        self._max_len = max(self._lengths, default=timedelta(0))
+                return
+
+    def neighbours(self, start_dt: datetime, end_dt: datetime):
+        """
+        Return (overlapping, previous, next) for the slot start_dt–end_dt.
+        previous/next are the closest non-overlapping bookings on each side.
+        """
+        lo = bisect.bisect_left(self._starts, start_dt - self._max_len)
+        hi = bisect.bisect_left(self._starts, end_dt)
+        overlapping = [b for b in self._items[lo:hi] if b["end_dt"] > start_dt]
+
+        # walk back from start_dt; stop once nothing further left can end later
+        prev_b = None
+        i = bisect.bisect_right(self._starts, start_dt) - 1
+        while i >= 0:
+            if prev_b is not None and self._starts[i] + self._max_len <= prev_b["end_dt"]:
+                break
+            b = self._items[i]
+            if b["end_dt"] <= start_dt and (prev_b is None or b["end_dt"] > prev_b["end_dt"]):
+                prev_b = b
+            i -= 1
+
+        next_b = self._items[hi] if hi < len(self._items) else None
+        return overlapping, prev_b, next_b
+
+
+def check_time_spacing(start_dt: datetime, end_dt: datetime, index: BookingIndex, cluster=None):
+    """
+    Check overlap and travel-time gaps vs the neighbouring bookings in index.
+    Returns dict: {"overlap": bool, "close_gap": bool, "nearest": booking_or_None,
+                   "gap_minutes", "needed_minutes", "slack_minutes", "overlapping"}
+    Slack is the gap left after travel + setup buffer (negative = too tight).
     """
-    result = {"overlap": False, "close_gap": False, "nearest": None}
-    min_gap = None
+    result = {
+        "overlap": False,
+        "close_gap": False,
+        "nearest": None,
+        "gap_minutes": None,
+        "needed_minutes": None,
+        "slack_minutes": None,
+        "overlapping": [],
+    }
+    overlapping, prev_b, next_b = index.neighbours(start_dt, end_dt)
+
+    if overlapping:
+        result["overlap"] = True
+        result["overlapping"] = overlapping
+        result["nearest"] = min(overlapping, key=lambda b: b["start_dt"])
+        return result
 
-    for b in other_bookings:
-        b_start = b.get("start_dt")
-        b_end = b.get("end_dt")
-        if not b_start or not b_end:
+    for b, gap in (
+        (prev_b, prev_b and start_dt - prev_b["end_dt"]),
+        (next_b, next_b and next_b["start_dt"] - end_dt),
+    ):
+        if b is None:
             continue
+        gap_minutes = int(gap.total_seconds() // 60)
+        needed = required_gap_minutes(cluster, b.get("cluster"))
+        slack = gap_minutes - needed
+        if result["slack_minutes"] is None or slack < result["slack_minutes"]:
+            result.update(
+                nearest=b,
+                gap_minutes=gap_minutes,
+                needed_minutes=needed,
+                slack_minutes=slack,
+                close_gap=slack < 0,
+            )
+
+    return result
+
+
+def format_minutes(minutes: int) -> str:
+    """90 -> '1h 30m', 45 -> '45m'."""
+    sign = "-" if minutes < 0 else ""
+    hours, mins = divmod(abs(minutes), 60)
+    if hours:
+        return f"{sign}{hours}h {mins:02d}m"
+    return f"{sign}{mins}m"
+
+
+def clash_notes(spacing: dict):
+    """Return (client_note, admin_text) describing a clash check result."""
+    if spacing.get("unavailable"):
+        return (
+            "\n\n⚠️ _We don't usually shoot this type at this time._ "
+            "We'll confirm manually and let you know if it works.",
+            "NOTE: no photographer covers this type/time.\n",
+        )
+
+    if spacing["overlap"]:
+        return (
+            "\n\n⚠️ _This time clashes with another booking._ "
+            "We'll confirm manually and may need to adjust your time.",
+            "CLASH: overlaps with another booking.\n",
+        )
+
+    if spacing["nearest"] is None:
+        return "", ""
+
+    nearest = spacing["nearest"]
+    gap = format_minutes(spacing["gap_minutes"])
+    needed = format_minutes(spacing["needed_minutes"])
+    slack = format_minutes(spacing["slack_minutes"])
+    where = nearest.get("location_match") or nearest.get("location") or "unknown"
+
+    # the client sees the slack too, but not where the other shoot is
+    if spacing["close_gap"]:
+        short = format_minutes(-spacing["slack_minutes"])
+        return (
+            f"\n\n⚠️ _Only {gap} between this and another shoot "
+            f"(we need about {needed} to travel and set up, so {short} short)._ "
+            "We'll confirm manually and let you know if timing works.",
+            f"NOTE: slack {slack} vs booking at {where} "
+            f"(gap {gap}, needs {needed}).\n",
+        )
+    client_note = (
+        f"\n\n🕒 _Timing: {gap} between this and our nearest other shoot, "
+        f"{slack} more than we need to travel and set up._"
+    )
+    return client_note, f"Slack: +{slack} vs nearest booking at {where} (gap {gap}).\n"
+
+
+# ---------- BLACKOUTS ---------- #
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def write_atomic(path: str, text: str):
+    """Write text to path via a temp file + rename, so readers never see half a file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _window(day: date, start: time, end: time):
+    """Datetime window on day; an end at/before start runs past midnight."""
+    start_dt = datetime.combine(day, start)
+    end_dt = datetime.combine(day, end)
+    if end_dt <= start_dt:
+        end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+
+class BlackoutCalendar:
+    """
+    Admin blocks: one-off ranges plus daily / weekly windows.
+    Rules are expanded lazily, one month at a time, into the same
+    BookingIndex structure the clash checks use, and cached until the
+    rules change – so a booking check is a couple of bisects, not a
+    walk over recurrence rules.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rules = []
+        self._months = {}
+        self._mtime = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        """Pick up blocks another process wrote. Returns True if reloaded."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.rules = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to load blocks file: %s", e)
+            return False
+        self._months.clear()
+        return True
+
+    def _save(self):
+        self._months.clear()
+        write_atomic(self.path, json.dumps(self.rules, indent=2))
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def add(self, rule: dict) -> dict:
+        rule["id"] = max((r["id"] for r in self.rules), default=0) + 1
+        self.rules.append(rule)
+        self._save()
+        return rule
+
+    def remove(self, rule_id: int) -> bool:
+        kept = [r for r in self.rules if r["id"] != rule_id]
+        if len(kept) == len(self.rules):
+            return False
+        self.rules = kept
+        self._save()
+        return True
+
+    def _expand(self, year: int, month: int) -> BookingIndex:
+        first = date(year, month, 1)
+        last = (first + timedelta(days=32)).replace(day=1)
+        month_start = datetime.combine(first, time(0))
+        month_end = datetime.combine(last, time(0))
+        index = BookingIndex()
+
+        for rule in self.rules:
+            if rule["kind"] == "range":
+                start_dt = datetime.fromisoformat(rule["start"])
+                end_dt = datetime.fromisoformat(rule["end"])
+                if start_dt < month_end and end_dt > month_start:
+                    index.add({"start_dt": start_dt, "end_dt": end_dt, "block": rule})
+                continue
+
+            start = time.fromisoformat(rule["from"])
+            end = time.fromisoformat(rule["to"])
+            # start a day early so windows running past midnight spill in
+            day = first - timedelta(days=1)
+            while day < last:
+                if rule["kind"] == "daily" or day.weekday() == rule["weekday"]:
+                    start_dt, end_dt = _window(day, start, end)
+                    index.add({"start_dt": start_dt, "end_dt": end_dt, "block": rule})
+                day += timedelta(days=1)
+        return index
+
+    def month(self, year: int, month: int) -> BookingIndex:
+        index = self._months.get((year, month))
+        if index is None:
+            index = self._months[(year, month)] = self._expand(year, month)
+        return index
+
+    def conflict(self, start_dt: datetime, end_dt: datetime):
+        """Return the first block rule overlapping start_dt–end_dt, or None."""
+        if not self.rules:
+            return None
+        year, month = start_dt.year, start_dt.month
+        while (year, month) <= (end_dt.year, end_dt.month):
+            overlapping, _, _ = self.month(year, month).neighbours(start_dt, end_dt)
+            if overlapping:
+                return overlapping[0]["block"]
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return None
+
+
+BLACKOUTS = BlackoutCalendar(BLOCKS_FILE)
+
+
+def describe_block(rule: dict) -> str:
+    if rule["kind"] == "range":
+        what = f"{rule['start'].replace('T', ' ')} → {rule['end'].replace('T', ' ')}"
+    elif rule["kind"] == "weekly":
+        what = f"every {WEEKDAYS[rule['weekday']].title()} {rule['from']}–{rule['to']}"
+    else:
+        what = f"daily {rule['from']}–{rule['to']}"
+    reason = f" ({rule['reason']})" if rule.get("reason") else ""
+    return f"#{rule['id']} {what}{reason}"
+
+
+def parse_block_args(args):
+    """
+    Turn /block arguments into a rule dict:
+      <from> <to> [reason]                 YYYY-MM-DD or YYYY-MM-DDTHH:MM
+      daily HH:MM-HH:MM [reason]
+      weekly <mon..sun> HH:MM-HH:MM [reason]
+    Raises ValueError on bad input.
+    """
+    if not args:
+        raise ValueError("missing arguments")
+
+    kind = args[0].lower()
+    if kind in ("daily", "weekly"):
+        rest = args[1:]
+        rule = {"kind": kind}
+        if kind == "weekly":
+            if not rest or rest[0].lower()[:3] not in WEEKDAYS:
+                raise ValueError("weekday must be one of " + ", ".join(WEEKDAYS))
+            rule["weekday"] = WEEKDAYS.index(rest[0].lower()[:3])
+            rest = rest[1:]
+        if not rest or "-" not in rest[0]:
+            raise ValueError("window must look like 00:00-09:00")
+        start_text, end_text = rest[0].split("-", 1)
+        rule["from"] = parse_time_str(start_text).isoformat(timespec="minutes")
+        rule["to"] = parse_time_str(end_text).isoformat(timespec="minutes")
+        rule["reason"] = " ".join(rest[1:])
+        return rule
+
+    if len(args) < 2:
+        raise ValueError("a range needs <from> and <to>")
+    start_dt = datetime.fromisoformat(args[0])
+    end_dt = datetime.fromisoformat(args[1])
+    if "T" not in args[1]:
+        # whole-day end date is inclusive
+        end_dt += timedelta(days=1)
+    if end_dt <= start_dt:
+        raise ValueError("end must be after start")
+    return {
+        "kind": "range",
+        "start": start_dt.isoformat(timespec="minutes"),
+        "end": end_dt.isoformat(timespec="minutes"),
+        "reason": " ".join(args[2:]),
+    }
+
+
+def blocked_message(rule: dict) -> str:
+    reason = f" ({rule['reason']})" if rule.get("reason") else ""
+    return (
+        f"Sorry, we're not taking shoots at that time{reason}.\n"
+        "Please /book again with a different date or time."
+    )
+
+
+# ---------- RESOURCES ---------- #
+
+class Resource:
+    """A photographer or crew with its own calendar (interval index)."""
+
+    def __init__(self, rid: str, name: str = None, capacity: int = 1,
+                 hours=None, types=("lifestyle", "matchday")):
+        self.id = rid
+        self.name = name or rid
+        # how many shoots this resource can run at once
+        self.capacity = max(int(capacity), 1)
+        # (start, end) working hours; None means any time
+        self.hours = tuple(parse_time_str(h) for h in hours) if hours else None
+        self.types = frozenset(types)
+        self.index = BookingIndex()
+
+    def qualifies(self, booking: dict) -> bool:
+        """Right shoot type and inside working hours."""
+        if booking.get("type") not in self.types:
+            return False
+        if self.hours is None:
+            return True
+        day = booking["start_dt"].date()
+        return (
+            datetime.combine(day, self.hours[0]) <= booking["start_dt"]
+            and booking["end_dt"] <= datetime.combine(day, self.hours[1])
+        )
+
+    def is_free(self, spacing: dict) -> bool:
+        busy = len(spacing["overlapping"]) + (1 if spacing["close_gap"] else 0)
+        return busy < self.capacity
+
 
-        # Overlap
-        if start_dt < b_end and end_dt > b_start:
-            result["overlap"] = True
-            if result["nearest"] is None or b_start < result["nearest"]["start_dt"]:
-                result["nearest"] = b
+def _mark_free(spacing: dict) -> dict:
+    """Clear clash flags once a resource has room (capacity > 1 may overlap)."""
+    if spacing["overlap"]:
+        spacing["nearest"] = None
+    spacing["overlap"] = spacing["close_gap"] = False
+    return spacing
+
+
+def load_resources(path: str):
+    """
+    Resources from a JSON list, e.g.
+    [{"id": "great", "name": "Great", "capacity": 1,
+      "hours": ["08:00", "22:00"], "types": ["lifestyle", "matchday"]}]
+    "hours" and "types" are optional (default: any time, every shoot type).
+    Falls back to a single resource (the old one-calendar behaviour).
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            specs = json.load(f)
+        resources = {}
+        for spec in specs:
+            res = Resource(
+                spec["id"],
+                spec.get("name"),
+                spec.get("capacity", 1),
+                spec.get("hours"),
+                spec.get("types", ("lifestyle", "matchday")),
+            )
+            resources[res.id] = res
+        if resources:
+            return resources
+    except FileNotFoundError:
+        pass
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Failed to load resources file: %s", e)
+    return {"main": Resource("main", "Main")}
+
+
+# Resources by id, in assignment priority order
+RESOURCES = load_resources(RESOURCES_FILE)
+
+
+def resource_of(booking: dict):
+    return RESOURCES.get(booking.get("resource"))
+
+
+def assign_resource(booking: dict):
+    """
+    Pick the first qualified resource that is free for this booking.
+    Returns (resource_or_None, spacing). The clash flags in spacing only
+    stay set when every qualified resource is busy.
+    """
+    fallback = None
+    for res in RESOURCES.values():
+        if not res.qualifies(booking):
             continue
+        spacing = check_time_spacing(
+            booking["start_dt"], booking["end_dt"], res.index, booking.get("cluster")
+        )
+        if res.is_free(spacing):
+            return res, _mark_free(spacing)
+        # least bad option: prefer a tight gap over a straight overlap
+        if fallback is None or (fallback[1]["overlap"] and not spacing["overlap"]):
+            fallback = (res, spacing)
+
+    if fallback is None:
+        spacing = check_time_spacing(booking["start_dt"], booking["end_dt"], BookingIndex())
+        spacing["unavailable"] = True
+        return None, spacing
+    return fallback
+
+
+def move_booking(user_id: int, res: Resource):
+    """
+    Admin override: put the user's pending booking on res.
+    Returns (booking, clash check there), or (None, None) if there is none.
+    """
+    with shared_transaction():
+        # fetched after the transaction's pull, so it's the latest copy
+        booking = BOOKINGS.get(user_id)
+        if booking is None:
+            return None, None
+        old = resource_of(booking)
+        if old is not None:
+            old.index.remove(booking)
+        spacing = check_time_spacing(
+            booking["start_dt"], booking["end_dt"], res.index, booking.get("cluster")
+        )
+        if res.is_free(spacing):
+            _mark_free(spacing)
+        res.index.add(booking)
+        booking["resource"] = res.id
+        record_booking_write(booking)
+    return booking, spacing
+
+
+def resource_tag(booking: dict) -> str:
+    """Admin notification line with the assigned photographer."""
+    res = resource_of(booking)
+    return f"Photographer: {res.name if res else 'unassigned'}\n"
+
+
+def add_pending_booking(booking: dict) -> dict:
+    """
+    Store a new pending booking (replacing the user's previous one),
+    assign it to a resource and return its clash check.
+    """
+    # in multi-process mode this also locks the shared store, so the clash
+    # check sees every worker's bookings and nobody claims the slot meanwhile
+    with shared_transaction():
+        old = BOOKINGS.get(booking["user_id"])
+        if old is not None:
+            res = resource_of(old)
+            if res is not None:
+                res.index.remove(old)
+            SEARCH_INDEX.remove(booking_key(old))
+            if STORE is not None:
+                STORE.put(booking_key(old), None)
+        BOOKINGS[booking["user_id"]] = booking
+
+        res, spacing = assign_resource(booking)
+        booking["resource"] = res.id if res else None
+        if res is not None:
+            res.index.add(booking)
+        record_booking_write(booking)
+    return spacing
+
+
+# ---------- SEARCH ---------- #
+
+# Columns written by save_booking_to_csv (older rows only have the first five
+# of: timestamp, name, date, location, type)
+CSV_COLUMNS = [
+    "saved_at", "user_id", "username", "name", "instagram", "date", "time",
+    "location", "type", "hours", "players", "base_price", "travel_fee",
+    "total", "start_dt", "end_dt",
+]
+LEGACY_CSV_COLUMNS = ["saved_at", "name", "date", "location", "type"]
+
+
+def _trigrams(text: str):
+    """Padded word trigrams: "jo" -> {"  j", " jo", "jo "}."""
+    grams = set()
+    for word in normalise_location(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _search_record(booking: dict, status: str = None) -> dict:
+    """The fields /find shows for a booking."""
+    return {
+        "user_id": booking.get("user_id"),
+        "status": status or booking.get("status"),
+        "name": booking.get("name"),
+        "instagram": booking.get("instagram"),
+        "username": booking.get("username"),
+        "location": booking.get("location"),
+        "type": booking.get("type"),
+        "date": booking.get("date"),
+        "time": booking.get("time"),
+    }
+
+
+def _search_grams(record: dict):
+    return _trigrams(" ".join(str(record.get(f) or "") for f in SearchIndex.FIELDS))
 
-        # Non-overlap gap
-        if end_dt <= b_start:
-            gap_seconds = (b_start - end_dt).total_seconds()
-        elif start_dt >= b_end:
-            gap_seconds = (start_dt - b_end).total_seconds()
+
+def _split_by_rarity(query_grams, min_hits: int, postings: dict):
+    """
+    Any doc holding >= min_hits of query_grams holds one of the
+    (len - min_hits + 1) rarest, so only those postings need walking; the
+    commoner ones are just probed per candidate and never fan out.
+    """
+    by_rarity = sorted(query_grams, key=lambda g: len(postings.get(g, ())))
+    split = len(query_grams) - min_hits + 1
+    rare = [postings[g] for g in by_rarity[:split] if g in postings]
+    rest = [postings[g] for g in by_rarity[split:] if g in postings]
+    return rare, rest
+
+
+def _count_hits(doc_id: int, hits: int, min_hits: int, rest: list) -> int:
+    """hits plus the rest postings holding doc_id (stops once min_hits is out of reach)."""
+    for i, ids in enumerate(rest):
+        if hits + len(rest) - i < min_hits:
+            break
+        hits += doc_id in ids
+    return hits
+
+
+class SearchIndex:
+    """
+    Trigram inverted index over booking name / Instagram / username / location.
+    Updated in place on every booking write so /find never rebuilds anything.
+    Confirmed bookings from the CSV live in `history`, built once in the
+    background (see load_search_history).
+    """
+
+    FIELDS = ("name", "instagram", "username", "location")
+
+    def __init__(self):
+        self._ids = {}          # booking key -> doc id
+        self._docs = {}         # doc id -> summary record
+        self._postings = {}     # trigram -> set of doc ids
+        self._next_id = 0
+        self.history = None     # HistoryIndex, once built
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def upsert(self, key, booking: dict):
+        doc_id = self._ids.get(key)
+        if doc_id is not None:
+            self._unlink(doc_id)
+            del self._ids[key]
+        # a fresh id on every write, so ids order docs by last change
+        doc_id = self._next_id
+        self._next_id += 1
+        self._ids[key] = doc_id
+
+        record = _search_record(booking)
+        for gram in _search_grams(record):
+            self._postings.setdefault(gram, set()).add(doc_id)
+        self._docs[doc_id] = record
+
+    def remove(self, key):
+        doc_id = self._ids.pop(key, None)
+        if doc_id is not None:
+            self._unlink(doc_id)
+
+    def _unlink(self, doc_id: int):
+        for gram in _search_grams(self._docs.pop(doc_id)):
+            docs = self._postings.get(gram)
+            if docs is not None:
+                docs.discard(doc_id)
+                if not docs:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.4):
+        """
+        Return up to `limit` (score, record) pairs, best first, then newest.
+        Score is the share of query trigrams found in the booking.
+        """
+        query_grams = _trigrams(query)
+        if not query_grams:
+            return []
+        min_hits = max(1, math.ceil(len(query_grams) * min_similarity))
+
+        # live bookings are few: score them all; (hits, source, doc id, record)
+        # with source 1 so a live booking wins a tie with history
+        rare, rest = _split_by_rarity(query_grams, min_hits, self._postings)
+        counts = Counter()
+        for ids in rare:
+            counts.update(ids)
+        found = []
+        for doc_id, hits in counts.items():
+            hits = _count_hits(doc_id, hits, min_hits, rest)
+            if hits >= min_hits:
+                found.append((hits, 1, doc_id, self._docs[doc_id]))
+
+        history = self.history
+        if history is not None:
+            found += self._best_history(history, query_grams, min_hits, limit)
+        found.sort(key=lambda f: f[:3], reverse=True)
+        return [(round(hits / len(query_grams), 2), record) for hits, _, _, record in found[:limit]]
+
+    def _best_history(self, history, query_grams, min_hits: int, limit: int):
+        """
+        The best `limit` history rows not also live, as (hits, 0, row, record).
+
+        History can hold a million rows, so rather than score every row
+        sharing a trigram, look for rows holding all query trigrams, then
+        all but one, and so on, newest first. A pass that doesn't fill the
+        page has seen every row with that many hits, so the next pass only
+        tops the page up, and stops as soon as it is full.
+        """
+        found = []
+        for need in range(len(query_grams), min_hits - 1, -1):
+            for hits, doc_id in history.match(query_grams, need):
+                if hits > need:
+                    continue  # found by an earlier pass
+                key, record = history.record(doc_id)
+                if record is None or key in self._ids:
+                    continue  # unreadable, or also a live booking (which wins)
+                found.append((hits, 0, doc_id, record))
+                if len(found) >= limit:
+                    return found
+        return found
+
+
+class HistoryIndex:
+    """
+    Read-only trigram index over the (append-only) bookings CSV.
+    Postings are sorted arrays of row numbers and each row keeps only its
+    byte offset, so a million rows cost a couple of hundred MB rather than
+    GBs; the few rows /find shows are re-read from the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = array("q")  # row -> byte offset in path
+        self._postings = {}        # trigram -> array("I") of rows, ascending
+        for offset, _, row in read_bookings_csv(path):
+            doc_id = len(self.offsets)
+            for gram in _search_grams(row):
+                ids = self._postings.get(gram)
+                if ids is None:
+                    ids = self._postings[gram] = array("I")
+                ids.append(doc_id)
+            self.offsets.append(offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def match(self, query_grams, min_hits: int):
+        """Yield (hits, row) for rows holding >= min_hits of query_grams, newest first."""
+        rare, rest = _split_by_rarity(query_grams, min_hits, self._postings)
+        if len(rare) == 1:
+            newest_first = ((doc_id, 1) for doc_id in reversed(rare[0]))
+        else:
+            counts = Counter()
+            for ids in rare:
+                counts.update(ids)
+            newest_first = sorted(counts.items(), reverse=True)
+        # _count_hits over sorted arrays, inlined: this loop is /find's hot path
+        bisect_left = bisect.bisect_left
+        probes = [(ids, len(ids), min_hits - len(rest) + i) for i, ids in enumerate(rest)]
+        for doc_id, hits in newest_first:
+            for ids, size, at_least in probes:
+                if hits < at_least:
+                    break
+                j = bisect_left(ids, doc_id)
+                if j < size and ids[j] == doc_id:
+                    hits += 1
+            if hits >= min_hits:
+                yield hits, doc_id
+
+    def record(self, doc_id: int):
+        """(booking key, search record) for a row, or (None, None) if unreadable."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offsets[doc_id])
+                offset, _, row = next(_bookings_csv_rows(f, self.path), (None, None, None))
+        except OSError:
+            return None, None
+        if row is None or offset != self.offsets[doc_id]:
+            return None, None  # the file changed under us
+        if row.get("start_dt"):
+            key = f"{row['user_id']}:{row['start_dt']}"
+        else:
+            key = f"csv:{offset}"
+        return key, _search_record(row, status="confirmed")
+
+
+SEARCH_INDEX = SearchIndex()
+_SEARCH_HISTORY_LOADED = False
+_SEARCH_HISTORY_LOCK = threading.Lock()
+
+
+def booking_key(booking: dict) -> str:
+    """Stable id for a booking: user + slot start."""
+    start_dt = booking.get("start_dt")
+    return f"{booking.get('user_id')}:{start_dt.isoformat() if start_dt else ''}"
+
+
+# Bumped on every booking write; the admin API caches responses per version
+DATA_VERSION = 0
+
+
+def record_booking_write(booking: dict):
+    """Keep derived indexes in step with a created / updated booking."""
+    global DATA_VERSION
+    SEARCH_INDEX.upsert(booking_key(booking), booking)
+    DATA_VERSION += 1
+    if STORE is not None:
+        STORE.put(booking_key(booking), booking)
+
+
+def _bookings_csv_rows(f, path: str):
+    """
+    Yield (byte offset, record number, row dict) from binary file f onwards.
+    Reads whole records, so a quoted field spanning lines stays one row.
+    """
+    offset = f.tell()
+    line_no = 0
+    while line := f.readline():
+        start = offset
+        offset += len(line)
+        # an odd number of quotes means a quoted field runs onto the next line
+        while line.count(b'"') % 2 and (more := f.readline()):
+            line += more
+            offset += len(more)
+        line_no += 1
+        values = next(csv.reader([line.decode("utf-8", "replace")]), [])
+        if len(values) == len(CSV_COLUMNS):
+            row = dict(zip(CSV_COLUMNS, values))
+        elif len(values) == len(LEGACY_CSV_COLUMNS):
+            row = dict(zip(LEGACY_CSV_COLUMNS, values))
+        elif values:
+            # e.g. rows written unquoted before commas were escaped
+            logger.warning(
+                "Skipping %s line %d: %d columns, expected %d",
+                path, line_no, len(values), len(CSV_COLUMNS),
+            )
+            continue
         else:
             continue
+        yield start, line_no, row
 
-        if min_gap is None or gap_seconds < min_gap:
-            min_gap = gap_seconds
-            result["nearest"] = b
-            result["close_gap"] = gap_seconds < 3 * 3600  # 3 hours
 
-    return result
+def read_bookings_csv(path: str = None):
+    """Yield (byte offset, line_no, row dict) from the bookings CSV, tolerating legacy rows."""
+    path = path or BOOKINGS_CSV
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        yield from _bookings_csv_rows(f, path)
+
+
+def load_search_history():
+    """
+    Index confirmed bookings from the CSV, once per process. Slow for a big
+    CSV, so it runs in the warm_up thread (or one /find starts) and /find
+    searches live bookings only until it is done.
+    """
+    global _SEARCH_HISTORY_LOADED
+    with _SEARCH_HISTORY_LOCK:
+        if _SEARCH_HISTORY_LOADED:
+            return
+        _SEARCH_HISTORY_LOADED = True
+    started = _time.perf_counter()
+    try:
+        SEARCH_INDEX.history = HistoryIndex(BOOKINGS_CSV)
+    except Exception as e:
+        logger.warning("Failed to index booking history: %s", e)
+        return
+    logger.info(
+        "Indexed %d history bookings in %.1fs",
+        len(SEARCH_INDEX.history), _time.perf_counter() - started,
+    )
+
+
+# ---------- MEMBERS ---------- #
+
+_IG_URL_RE = re.compile(r"^(?:https?://)?(?:www\.)?(?:instagram\.com|instagr\.am)/", re.I)
+
+
+def normalise_handle(text: str) -> str:
+    """
+    Reduce an Instagram handle to its bare lowercase form:
+    " @Invalid8th ", "instagram.com/invalid8th/?igsh=x" -> "invalid8th".
+    """
+    handle = _IG_URL_RE.sub("", (text or "").strip())
+    handle = handle.split("?")[0].strip("/").split("/")[0]
+    return re.sub(r"[^a-z0-9._]", "", handle.lower())
+
+
+class BloomFilter:
+    """Compact set for very large member lists (no false negatives)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self._size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return ((a + i * b) % self._size for i in range(self._hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class MemberList:
+    """
+    Member handles from MEMBERS_FILE, one per line (first CSV column is used,
+    "#" starts a comment). Reloads build a new container and swap it in, so
+    lookups never see a half-loaded list.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._members = frozenset()
+        self._mtime = None
+        # set once the first load has been tried (the list may not exist)
+        self.loaded = threading.Event()
+
+    def __contains__(self, handle: str) -> bool:
+        return normalise_handle(handle) in self._members
+
+    def _read_handles(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                handle = normalise_handle(line.split("#", 1)[0].split(",", 1)[0])
+                if handle:
+                    yield handle
+
+    def _count_lines(self) -> int:
+        lines = 0
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                lines += chunk.count(b"\n")
+        return lines + 1
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the file's mtime changed. Returns True if reloaded."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        # size the container from a cheap line count, so a huge list streams
+        # straight into the Bloom filter without a full set in between
+        lines = self._count_lines()
+        if lines > MEMBERS_BLOOM_THRESHOLD:
+            members = BloomFilter(lines)
+            count = 0
+            for handle in self._read_handles():
+                members.add(handle)
+                count += 1
+        else:
+            members = frozenset(self._read_handles())
+            count = len(members)
+
+        self._members = members
+        self._mtime = mtime
+        logger.info("Loaded %d member handles from %s", count, self.path)
+        return True
+
+    def watch(self):
+        """Poll for changes forever (run in a daemon thread, off the event loop)."""
+        while True:
+            _time.sleep(MEMBERS_RELOAD_SECONDS)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.warning("Failed to reload members file: %s", e)
+
+
+MEMBERS = MemberList(MEMBERS_FILE)
+
+
+def start_member_watcher():
+    """Load the member list and hot-reload it, all off the event loop."""
+
+    def run():
+        try:
+            MEMBERS.reload_if_changed()
+        except Exception as e:
+            logger.warning("Failed to load members file: %s", e)
+        finally:
+            MEMBERS.loaded.set()
+        MEMBERS.watch()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def member_tag(booking: dict) -> str:
+    """Admin notification line with member status."""
+    if booking.get("member"):
+        return "Member: ✅ verified\n"
+    return "Member: not on member list\n"
+
+
+# ---------- PRICING ---------- #
+
+# Shoot types the booking flow offers; a pricing file must price all of them
+SHOOT_TYPES = ("lifestyle", "matchday")
+
+# Used when PRICING_FILE is missing or unreadable (the original prices)
+DEFAULT_PRICING = {
+    "currency": "£",
+    "shoots": {
+        "lifestyle": {
+            "label": "Lifestyle Shoots",
+            "unit": ["hour", "hours"],
+            "tiers": [{"up_to": 1, "flat": 150}, {"per_unit": 100}],
+        },
+        "matchday": {
+            "label": "Matchday Shoots",
+            "unit": ["player", "players"],
+            "note": "same team",
+            "tiers": [{"up_to": 3, "flat": 300}, {"per_unit": 100}],
+        },
+    },
+    "member_discount_percent": 0,
+    "peak": [],
+    "travel": {"free_miles": 5, "per_mile": 2, "round_to": 5},
+}
+
+
+class PricingTable:
+    """
+    Prices from PRICING_FILE:
+      shoots  – per shoot type, tiers checked in order; the first whose
+                "up_to" covers the quantity (hours / players) gives
+                "flat" + "per_unit" * quantity. The last tier has no "up_to".
+                Every type in SHOOT_TYPES must be priced, each with a
+                "label" and "unit": [singular, plural] for /faqs.
+      peak    – [{"name", "from", "to", "weekdays", "percent"}]; from/to are
+                "YYYY-MM-DD" or yearly "MM-DD", weekdays e.g. ["sat", "Sunday"].
+      member_discount_percent, travel {free_miles, per_mile, round_to, max}.
+    Quotes are memoised per table, so a reload starts with an empty cache.
+    """
+
+    def __init__(self, data: dict):
+        self.currency = data.get("currency", "£")
+        self.shoots = data["shoots"]
+        self.member_discount_percent = data.get("member_discount_percent", 0)
+        self.peak = [self._peak_rule(rule) for rule in data.get("peak", [])]
+        travel = data.get("travel", {})
+        self.free_miles = float(travel.get("free_miles", 0))
+        self.per_mile = float(travel.get("per_mile", 0))
+        self.round_to = max(int(travel.get("round_to", 1)), 1)
+        self.max_travel_fee = travel.get("max")
+        missing = [t for t in SHOOT_TYPES if t not in self.shoots]
+        if missing:
+            raise ValueError(f"no prices for shoot type(s): {', '.join(missing)}")
+        for shoot_type, shoot in self.shoots.items():
+            if not shoot.get("tiers") or shoot["tiers"][-1].get("up_to") is not None:
+                raise ValueError(f"{shoot_type}: last tier must have no up_to")
+            # /faqs reads these
+            unit = shoot.get("unit")
+            if not shoot.get("label") or not isinstance(unit, list) or len(unit) != 2:
+                raise ValueError(f'{shoot_type}: needs a "label" and "unit": [singular, plural]')
+        self.quote = functools.lru_cache(maxsize=4096)(self._quote)
+
+    @staticmethod
+    def _peak_rule(rule: dict) -> dict:
+        """rule with weekdays as WEEKDAYS keys, so "Sat" / "Saturday" match too."""
+        if not rule.get("weekdays"):
+            return rule
+        unknown = [str(day) for day in rule["weekdays"] if str(day).lower()[:3] not in WEEKDAYS]
+        if unknown:
+            raise ValueError(f"{rule.get('name', 'peak rule')}: unknown weekday(s) {', '.join(unknown)}")
+        return {**rule, "weekdays": [str(day).lower()[:3] for day in rule["weekdays"]]}
+
+    def _tier_price(self, shoot_type: str, quantity: int) -> int:
+        for tier in self.shoots[shoot_type]["tiers"]:
+            if tier.get("up_to") is None or quantity <= tier["up_to"]:
+                return tier.get("flat", 0) + tier.get("per_unit", 0) * quantity
+
+    def peak_rule(self, day: date):
+        """First peak rule covering day, or None."""
+        for rule in self.peak:
+            if rule.get("weekdays") and WEEKDAYS[day.weekday()] not in rule["weekdays"]:
+                continue
+            start, end = rule.get("from"), rule.get("to") or rule.get("from")
+            if start:
+                key = day.isoformat() if len(start) == 10 else day.strftime("%m-%d")
+                # yearly ranges may wrap round new year (e.g. 12-20 → 01-02)
+                inside = start <= key <= end if start <= end else (key >= start or key <= end)
+                if not inside:
+                    continue
+            return rule
+        return None
+
+    def _quote(self, shoot_type: str, quantity: int, day: date, member: bool) -> dict:
+        """
+        Shoot fee (no travel) for quantity hours / players on day.
+        Returns {"base", "peak", "member_discount", "price"}; read-only.
+        """
+        base = self._tier_price(shoot_type, quantity)
+        # Decimal so percentages are exact and halves round up (£142.50 → £143)
+        price = Decimal(str(base))
+        rule = self.peak_rule(day) if day else None
+        if rule:
+            price += price * Decimal(str(rule.get("percent", 0))) / 100
+        discount = self.member_discount_percent if member else 0
+        price = price * (100 - Decimal(str(discount))) / 100
+        return {
+            "base": base,
+            "peak": rule.get("name", "peak date") if rule else None,
+            "member_discount": discount,
+            "price": int(price.quantize(Decimal(1), rounding=ROUND_HALF_UP)),
+        }
+
+    def travel_fee(self, distance_miles: float) -> int:
+        """Suggested travel fee for a distance from home base."""
+        chargeable = max(0.0, distance_miles - self.free_miles)
+        fee = int(math.ceil(chargeable * self.per_mile / self.round_to) * self.round_to)
+        if self.max_travel_fee is not None:
+            fee = min(fee, int(self.max_travel_fee))
+        return fee
+
+    def _tier_lines(self, shoot: dict):
+        one, many = shoot["unit"]
+        note = f" ({shoot['note']})" if shoot.get("note") else ""
+        lo = 1
+        for tier in shoot["tiers"]:
+            hi = tier.get("up_to")
+            if hi is None:
+                qty = f"{lo}+ {many}"
+            elif hi == lo:
+                qty = f"{lo} {one if lo == 1 else many}"
+            elif lo == 1:
+                qty = f"up to {hi} {many}"
+            else:
+                qty = f"{lo}–{hi} {many}"
+
+            flat, per_unit = tier.get("flat", 0), tier.get("per_unit", 0)
+            if per_unit and flat:
+                yield f"• {self.currency}{flat} + {self.currency}{per_unit} per {one} for {qty}{note}"
+            elif per_unit:
+                yield f"• {self.currency}{per_unit} per {one} for {qty}{note}"
+            elif hi is not None and hi > lo:
+                yield f"• {self.currency}{flat} total for {qty}{note}"
+            else:
+                yield f"• {self.currency}{flat} for {qty}{note}"
+            lo = (hi or lo) + 1
+
+    def faq_text(self) -> str:
+        """Pricing part of /faqs, built from the same tables as quotes."""
+        parts = []
+        for shoot in self.shoots.values():
+            lines = [f"*{shoot['label']}*", *self._tier_lines(shoot)]
+            lines.append("(*Travel fee added depending on location*)")
+            parts.append("\n".join(lines) + "\n\n")
+        extras = []
+        if self.member_discount_percent:
+            extras.append(f"• Members: {self.member_discount_percent}% off the shoot fee")
+        for rule in self.peak:
+            extras.append(f"• {rule.get('name', 'Peak dates')}: +{rule.get('percent', 0)}%")
+        if extras:
+            parts.append("*Offers & peak dates*\n" + "\n".join(extras) + "\n\n")
+        return "".join(parts)
+
+
+def load_pricing(path: str):
+    """PricingTable from path, or None (with a warning) if it can't be used."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return PricingTable(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Failed to load pricing file: %s", e)
+        return None
+
+
+_PRICING = None
+_PRICING_MTIME = None
+
+
+def get_pricing() -> PricingTable:
+    """Current prices; PRICING_FILE is re-read when its mtime changes."""
+    global _PRICING, _PRICING_MTIME
+    try:
+        mtime = os.stat(PRICING_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _PRICING is None or mtime != _PRICING_MTIME:
+        _PRICING_MTIME = mtime
+        table = load_pricing(PRICING_FILE)
+        if table is None and _PRICING is None:
+            table = PricingTable(DEFAULT_PRICING)
+        if table is not None:
+            _PRICING = table
+            # memoised location matches carry a suggested travel fee
+            resolve_location.cache_clear()
+    return _PRICING
+
+
+def quote_booking(booking: dict, pricing: PricingTable = None) -> dict:
+    """Quote for an existing booking's type, size, date and member status."""
+    pricing = pricing or get_pricing()
+    quantity = booking["hours"] if booking["type"] == "lifestyle" else booking["players"]
+    return pricing.quote(booking["type"], int(quantity), booking["start_dt"].date(), bool(booking.get("member")))
+
+
+def peak_note(booking: dict) -> str:
+    """Client summary suffix when peak pricing applied."""
+    return f" (incl. {booking['peak']} pricing)" if booking.get("peak") else ""
+
+
+# ---------- STATE ---------- #
+
+STATE_VERSION = 1
+_DT_FIELDS = ("start_dt", "end_dt")
+_REQUIRED_FIELDS = ("user_id", "type", "base_price", "start_dt", "end_dt")
+# Keep confirmed bookings around this long after they end (clash checks only
+# care about the future; bookings.csv remains the full record)
+_CONFIRMED_RETENTION = timedelta(days=1)
+
+
+def booking_to_json(booking: dict) -> dict:
+    data = dict(booking)
+    for field in _DT_FIELDS:
+        if data.get(field):
+            data[field] = data[field].isoformat()
+    return data
+
+
+def booking_from_json(data: dict) -> dict:
+    booking = dict(data)
+    for field in _DT_FIELDS:
+        if booking.get(field):
+            booking[field] = datetime.fromisoformat(booking[field])
+    return booking
+
+
+def save_state() -> dict:
+    """Flush pending + recent confirmed bookings to STATE_FILE. Returns counts."""
+    cutoff = datetime.now() - _CONFIRMED_RETENTION
+    pending = list(BOOKINGS.values())
+    confirmed = [b for b in CONFIRMED_BOOKINGS if b.get("end_dt") and b["end_dt"] >= cutoff]
+    state = {
+        "version": STATE_VERSION,
+        "saved_at": datetime.utcnow().isoformat(),
+        "pending": [booking_to_json(b) for b in pending],
+        "confirmed": [booking_to_json(b) for b in confirmed],
+    }
+    write_atomic(STATE_FILE, json.dumps(state, default=str))
+    return {"pending": len(pending), "confirmed": len(confirmed)}
+
+
+def verify_state(pending, confirmed):
+    """
+    Cheap consistency pass over restored bookings.
+    Returns (pending, confirmed, problems); bad entries are dropped.
+    """
+    problems = []
+
+    def valid(b, label):
+        missing = [f for f in _REQUIRED_FIELDS if b.get(f) is None]
+        if missing:
+            problems.append(f"{label} booking {booking_key(b)} missing {', '.join(missing)}")
+            return False
+        if b["end_dt"] <= b["start_dt"]:
+            problems.append(f"{label} booking {booking_key(b)} ends before it starts")
+            return False
+        return True
+
+    confirmed = [b for b in confirmed if valid(b, "confirmed")]
+    confirmed_keys = {booking_key(b) for b in confirmed}
+
+    by_user = {}
+    for b in pending:
+        if not valid(b, "pending"):
+            continue
+        if booking_key(b) in confirmed_keys:
+            problems.append(f"pending booking {booking_key(b)} is already confirmed")
+            continue
+        if b["user_id"] in by_user:
+            problems.append(f"user {b['user_id']} had two pending bookings, kept the last")
+        by_user[b["user_id"]] = b
+
+    for b in list(by_user.values()) + confirmed:
+        if b.get("resource") not in RESOURCES:
+            b["resource"] = None
+
+    return list(by_user.values()), confirmed, problems
+
+
+def _leftover_temp_files():
+    paths = [f"{STATE_FILE}.tmp", f"{BLOCKS_FILE}.tmp"]
+    ics_dir = os.path.join("data", "ics")
+    if os.path.isdir(ics_dir):
+        paths += [os.path.join(ics_dir, n) for n in os.listdir(ics_dir) if n.endswith(".tmp")]
+    return [p for p in paths if os.path.exists(p)]
+
+
+def load_state() -> dict:
+    """
+    Restore bookings flushed by the last shutdown, verify them and rebuild
+    the clash and search indexes. Returns a short report.
+    """
+    report = {"pending": 0, "confirmed": 0, "problems": []}
+
+    for path in _leftover_temp_files():
+        # a write was interrupted; the real file is still the last good copy
+        report["problems"].append(f"removed interrupted write {path}")
+        os.remove(path)
+
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return report
+    except (OSError, ValueError) as e:
+        report["problems"].append(f"unreadable state file: {e}")
+        return report
+
+    if state.get("version") != STATE_VERSION:
+        report["problems"].append(f"unknown state version {state.get('version')}")
+        return report
+
+    pending, confirmed, problems = verify_state(
+        [booking_from_json(b) for b in state.get("pending", [])],
+        [booking_from_json(b) for b in state.get("confirmed", [])],
+    )
+    report["problems"] += problems
+
+    for b in confirmed:
+        CONFIRMED_BOOKINGS.append(b)
+        _restore_into_indexes(b)
+    for b in pending:
+        BOOKINGS[b["user_id"]] = b
+        _restore_into_indexes(b)
+
+    report["pending"] = len(pending)
+    report["confirmed"] = len(confirmed)
+    return report
+
+
+def _restore_into_indexes(booking: dict):
+    res = resource_of(booking)
+    if res is None:
+        res, _ = assign_resource(booking)
+        booking["resource"] = res.id if res else None
+    if res is not None:
+        res.index.add(booking)
+    record_booking_write(booking)
+
+
+# ---------- SHARED STORE ---------- #
+
+class SharedStore:
+    """
+    SQLite file shared by the worker processes in multi-process mode.
+    One row per booking key holds its latest version and a global seq;
+    each process pulls rows newer than the last seq it saw into its own
+    BOOKINGS / indexes, so lookups stay in memory. Writes that depend on
+    a clash check run inside BEGIN IMMEDIATE, which lets one process at a
+    time check-and-claim a slot.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS bookings ("
+            " key TEXT PRIMARY KEY, seq INTEGER NOT NULL, writer TEXT NOT NULL,"
+            " status TEXT, end_dt TEXT, data TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS bookings_seq ON bookings (seq)")
+        # rows this process wrote are already applied locally
+        self.writer = f"{os.getpid()}-{random.getrandbits(32):08x}"
+        self.seq = 0
+        self._lock = threading.RLock()
+        self._in_transaction = False
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Hold the store's write lock; nested calls join the outer one."""
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._in_transaction = True
+            try:
+                self.pull()
+                seq = self.seq
+                try:
+                    yield
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    self.seq = seq
+                    raise
+                self.conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+
+    def pull(self) -> int:
+        """Apply rows other processes wrote since the last pull. Returns how many."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, seq, writer, data FROM bookings WHERE seq > ? ORDER BY seq",
+                (self.seq,),
+            ).fetchall()
+            for key, seq, writer, data in rows:
+                if writer != self.writer:
+                    _apply_shared_row(key, data)
+                self.seq = seq
+        return len(rows)
+
+    def put(self, key: str, booking: dict = None):
+        """Write a booking's current version, or a tombstone if booking is None."""
+        with self.transaction():
+            self.seq += 1
+            data = status = end_dt = None
+            if booking is not None:
+                data = json.dumps(booking_to_json(booking), default=str)
+                status = booking.get("status")
+                end_dt = booking["end_dt"].isoformat() if booking.get("end_dt") else None
+            self.conn.execute(
+                "INSERT OR REPLACE INTO bookings VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.seq, self.writer, status, end_dt, data),
+            )
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM bookings LIMIT 1").fetchone() is None
+
+    def compact(self) -> int:
+        """
+        Drop tombstones and confirmed bookings past retention. Only safe
+        while no worker is running (they track rows by seq).
+        """
+        cutoff = (datetime.now() - _CONFIRMED_RETENTION).isoformat()
+        with self._lock:
+            cur = self.conn.execute(
+                "DELETE FROM bookings WHERE data IS NULL OR (status = 'confirmed' AND end_dt < ?)",
+                (cutoff,),
+            )
+        return cur.rowcount
+
+
+# bookings written by other processes, as applied here (key -> booking)
+_SHARED_BOOKINGS = {}
+
+
+def _apply_shared_row(key: str, data):
+    """Swap another process's version of a booking into the local indexes."""
+    global DATA_VERSION
+    old = _SHARED_BOOKINGS.pop(key, None)
+    if old is None:
+        # our own copy, changed elsewhere (e.g. /reprice on another worker)
+        user_id = key.split(":", 1)[0]
+        local = BOOKINGS.get(int(user_id)) if user_id.lstrip("-").isdigit() else None
+        if local is not None and booking_key(local) == key:
+            old = local
+    if old is not None:
+        res = resource_of(old)
+        if res is not None:
+            res.index.remove(old)
+        if BOOKINGS.get(old["user_id"]) is old:
+            del BOOKINGS[old["user_id"]]
+        if old.get("status") == "confirmed":
+            CONFIRMED_BOOKINGS[:] = [b for b in CONFIRMED_BOOKINGS if b is not old]
+        SEARCH_INDEX.remove(key)
+
+    if data is not None:
+        booking = booking_from_json(json.loads(data))
+        _SHARED_BOOKINGS[key] = booking
+        if booking.get("status") == "confirmed":
+            CONFIRMED_BOOKINGS.append(booking)
+        else:
+            BOOKINGS[booking["user_id"]] = booking
+        res = resource_of(booking)
+        if res is not None:
+            res.index.add(booking)
+        SEARCH_INDEX.upsert(key, booking)
+    DATA_VERSION += 1
+
+
+STORE = SharedStore(STORE_FILE) if BOT_WORKERS > 1 else None
+
+
+def shared_transaction():
+    """Store write lock in multi-process mode; a no-op otherwise."""
+    return STORE.transaction() if STORE is not None else contextlib.nullcontext()
+
+
+def sync_shared_state():
+    """Catch up on bookings and blocks other workers wrote."""
+    if STORE is not None:
+        STORE.pull()
+        BLACKOUTS.reload_if_changed()
+
+
+# ---------- ADMIN API ---------- #
+
+# Served from the health server's thread. Everything is built from the
+# in-memory bookings, then cached per DATA_VERSION with an ETag, so polling
+# an unchanged dataset is a dict lookup (or a 304).
+_API_ROWS = (-1, [], [], {})  # version, sort keys, rows, rows by key
+_API_CACHE = {}  # (path, query) -> (status, etag, body, gzipped body)
+_API_CACHE_VERSION = -1
+_API_CACHE_MAX = 1024
+_API_STATUSES = ("pending_travel", "awaiting_payment", "confirmed")
+
+
+def _booking_total(booking: dict):
+    if booking.get("travel_fee") is None:
+        return None
+    return booking["base_price"] + booking["travel_fee"]
+
+
+def _api_rows():
+    """Pending + confirmed bookings as JSON dicts, sorted by (start, key)."""
+    global _API_ROWS
+    version = DATA_VERSION
+    if _API_ROWS[0] != version:
+        by_key = {}
+        for b in list(CONFIRMED_BOOKINGS) + list(BOOKINGS.values()):
+            row = booking_to_json(b)
+            row["key"] = booking_key(b)
+            row["total"] = _booking_total(b)
+            by_key[row["key"]] = row
+        rows = sorted(by_key.values(), key=lambda r: (r.get("start_dt") or "", r["key"]))
+        keys = [(r.get("start_dt") or "", r["key"]) for r in rows]
+        _API_ROWS = (version, keys, rows, by_key)
+    return _API_ROWS
+
+
+def _encode_cursor(sort_key) -> str:
+    raw = json.dumps(list(sort_key)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    start, key = json.loads(raw)
+    return str(start), str(key)
+
+
+def api_bookings(params: dict):
+    """
+    /api/bookings?status=&type=&resource=&from=YYYY-MM-DD&to=YYYY-MM-DD&limit=&cursor=
+    Ordered by start time; pass next_cursor back to get the following page.
+    """
+    _, keys, rows, _ = _api_rows()
+    limit = min(max(int(params.get("limit", API_PAGE_SIZE)), 1), 500)
+
+    lo, hi = 0, len(keys)
+    if params.get("from"):
+        lo = bisect.bisect_left(keys, (date.fromisoformat(params["from"]).isoformat(), ""))
+    if params.get("to"):
+        day_after = date.fromisoformat(params["to"]) + timedelta(days=1)
+        hi = bisect.bisect_left(keys, (day_after.isoformat(), ""))
+    if params.get("cursor"):
+        lo = max(lo, bisect.bisect_right(keys, _decode_cursor(params["cursor"])))
+
+    filters = {f: params[f] for f in ("status", "type", "resource") if params.get(f)}
+    page, next_cursor, last_key = [], None, None
+    for i in range(lo, hi):
+        row = rows[i]
+        if any(str(row.get(f)) != v for f, v in filters.items()):
+            continue
+        if len(page) == limit:
+            # a further match exists: resume after the last row returned
+            next_cursor = _encode_cursor(last_key)
+            break
+        page.append(row)
+        last_key = keys[i]
+    return 200, {"bookings": page, "next_cursor": next_cursor}
+
+
+def api_booking(key: str):
+    row = _api_rows()[3].get(key)
+    if row is None:
+        return 404, {"error": "booking not found"}
+    return 200, row
+
+
+def api_pending():
+    rows = [r for r in _api_rows()[2] if r.get("status") != "confirmed"]
+    counts = {s: 0 for s in _API_STATUSES[:2]}
+    for r in rows:
+        counts[r.get("status")] = counts.get(r.get("status"), 0) + 1
+    return 200, {"pending": rows, "counts": counts}
+
+
+def api_stats():
+    rows = _api_rows()[2]
+    by_status = {s: 0 for s in _API_STATUSES}
+    by_type, by_resource = {}, {}
+    value = {s: 0 for s in _API_STATUSES}
+    for r in rows:
+        status = r.get("status")
+        by_status[status] = by_status.get(status, 0) + 1
+        by_type[r.get("type")] = by_type.get(r.get("type"), 0) + 1
+        by_resource[r.get("resource")] = by_resource.get(r.get("resource"), 0) + 1
+        value[status] = value.get(status, 0) + (r["total"] or 0)
+    return 200, {
+        "bookings": len(rows),
+        "by_status": by_status,
+        "by_type": by_type,
+        "by_resource": {str(k): v for k, v in by_resource.items()},
+        "value_by_status": value,
+        "first_start": rows[0].get("start_dt") if rows else None,
+        "last_start": rows[-1].get("start_dt") if rows else None,
+    }
+
+
+def _api_dispatch(path: str, query: str):
+    params = {k: v[-1] for k, v in parse_qs(query).items()}
+    try:
+        if path in ("/api/bookings", "/api/bookings/"):
+            return api_bookings(params)
+        if path.startswith("/api/bookings/"):
+            return api_booking(unquote(path[len("/api/bookings/"):]))
+        if path == "/api/pending":
+            return api_pending()
+        if path == "/api/stats":
+            return api_stats()
+    except (ValueError, TypeError) as e:
+        return 400, {"error": f"bad request: {e}"}
+    return 404, {"error": "unknown endpoint"}
+
+
+def _api_cached(path: str, query: str):
+    global _API_CACHE_VERSION
+    version = DATA_VERSION
+    if _API_CACHE_VERSION != version:
+        _API_CACHE.clear()
+        _API_CACHE_VERSION = version
+
+    entry = _API_CACHE.get((path, query))
+    if entry is None:
+        status, payload = _api_dispatch(path, query)
+        body = json.dumps(payload, default=str, separators=(",", ":")).encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        gzipped = gzip.compress(body, 6) if len(body) > 512 else None
+        entry = (status, etag, body, gzipped)
+        if len(_API_CACHE) < _API_CACHE_MAX:
+            _API_CACHE[(path, query)] = entry
+    return entry
+
+
+def handle_api(request: dict):
+    """HTTP_ROUTES handler for /api/ – bearer token auth, ETag + gzip."""
+    plain = {"Content-Type": "text/plain"}
+    if not ADMIN_API_TOKEN:
+        return 404, plain, b"not found"
+    if request["method"] not in ("GET", "HEAD"):
+        return 405, {**plain, "Allow": "GET, HEAD"}, b"read only"
+    auth = request["headers"].get("authorization", "").encode()
+    if not hmac.compare_digest(auth, f"Bearer {ADMIN_API_TOKEN}".encode()):
+        return 401, {**plain, "WWW-Authenticate": "Bearer"}, b"unauthorized"
+
+    sync_shared_state()
+    status, etag, body, gzipped = _api_cached(request["path"], request["query"])
+    headers = {
+        "Content-Type": "application/json",
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding, Authorization",
+    }
+    if gzipped is not None and "gzip" in request["headers"].get("accept-encoding", ""):
+        # a different representation, so a different strong ETag
+        headers["Content-Encoding"] = "gzip"
+        etag = etag[:-1] + '-gz"'
+        body = gzipped
+    headers["ETag"] = etag
+    seen = [t.strip().removeprefix("W/") for t in request["headers"].get("if-none-match", "").split(",")]
+    if status == 200 and (etag in seen or "*" in seen):
+        headers.pop("Content-Encoding", None)
+        return 304, headers, b""
+    return status, headers, body
+
+
+HTTP_ROUTES["/api/"] = handle_api
 
 
 def save_booking_to_csv(booking: dict):
@@ -133,31 +2238,32 @@ def save_booking_to_csv(booking: dict):
         os.makedirs("data", exist_ok=True)
         total = booking["base_price"] + (booking.get("travel_fee") or 0)
 
-        line = (
-            f"{datetime.utcnow().isoformat()},"
-            f"{booking.get('user_id')},"
-            f"{booking.get('username')},"
-            f"{booking.get('name')},"
-            f"{booking.get('instagram')},"
-            f"{booking.get('date')},"
-            f"{booking.get('time')},"
-            f"{booking.get('location')},"
-            f"{booking.get('type')},"
-            f"{booking.get('hours')},"
-            f"{booking.get('players')},"
-            f"{booking.get('base_price')},"
-            f"{booking.get('travel_fee')},"
-            f"{total},"
-            f"{booking.get('start_dt').isoformat() if booking.get('start_dt') else ''},"
-            f"{booking.get('end_dt').isoformat() if booking.get('end_dt') else ''}\n"
-        )
-
-        with open("data/bookings.csv", "a", encoding="utf-8") as f:
-            f.write(line)
+        row = [
+            datetime.utcnow().isoformat(),
+            booking.get("user_id"),
+            booking.get("username"),
+            booking.get("name"),
+            booking.get("instagram"),
+            booking.get("date"),
+            booking.get("time"),
+            booking.get("location"),
+            booking.get("type"),
+            booking.get("hours"),
+            booking.get("players"),
+            booking.get("base_price"),
+            booking.get("travel_fee"),
+            total,
+            booking.get("start_dt").isoformat() if booking.get("start_dt") else "",
+            booking.get("end_dt").isoformat() if booking.get("end_dt") else "",
+        ]
+
+        # csv.writer quotes free text (names, addresses) that contains commas
+        with open(BOOKINGS_CSV, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f, lineterminator="\n").writerow(row)
 
         CONFIRMED_BOOKINGS.append(booking.copy())
     except Exception as e:
-        logger.warning(f"Failed to save booking CSV: {e}")
+        logger.warning("Failed to save booking CSV: %s", e)
 def _escape_ics_text(text: str) -> str:
     """Escape text for ICS (commas, semicolons, backslashes, newlines)."""
     if text is None:
@@ -274,6 +2380,11 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• /faqs – FAQs & pricing\n"
         "• /travel <user_id> <amount> – set travel fee (admin)\n"
         "• /confirm <user_id> – confirm payment & booking (admin)\n"
+        "• /find <query> – search bookings by name, IG, username or location (admin)\n"
+        "• /assign <user_id> <photographer_id> – reassign a pending booking (admin)\n"
+        "• /block – list or add unavailable times (admin)\n"
+        "• /unblock <id> – remove a block (admin)\n"
+        "• /reprice [apply] – re-quote pending bookings after a price change (admin)\n"
         "• /export – download bookings CSV (admin)\n",
         parse_mode="Markdown",
     )
@@ -282,14 +2393,7 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def faqs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (
         "ℹ️ *Invalid8th FAQs*\n\n"
-        "*Lifestyle Shoots*\n"
-        "• £150 for 1 hour\n"
-        "• £100 per hour for 2+ hours\n"
-        "(*Travel fee added depending on location*)\n\n"
-        "*Matchday Shoots*\n"
-        "• £300 total for up to 3 players (same team)\n"
-        "• £100 per player for 4+ players (same team)\n"
-        "(*Travel fee added depending on location*)\n\n"
+        f"{get_pricing().faq_text()}"
         "*General*\n"
         "• Shoots: London & nationwide (UK)\n"
         "• Turnaround: 48–72 hours\n"
@@ -332,11 +2436,24 @@ async def book_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def book_ig(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ig = update.message.text.strip()
-    if not ig.startswith("@"):
+    handle = normalise_handle(ig)
+    if handle:
+        ig = "@" + handle
+    elif not ig.startswith("@"):
         ig = "@" + ig
+    if handle and not MEMBERS.loaded.is_set():
+        # just after a cold start a big list can still be loading; checking
+        # now would price a member as a non-member
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, MEMBERS.loaded.wait, MEMBERS_LOAD_WAIT_SECONDS):
+            logger.warning("Member list still loading, %s checked before it finished", handle)
+    member = bool(handle) and handle in MEMBERS
     context.user_data["book_ig"] = ig
+    context.user_data["book_member"] = member
+
+    verified = "✅ Member verified.\n\n" if member else ""
     await update.message.reply_text(
-        "Date of the shoot? *(e.g., 24 Nov 2025 or 24/11/2025)*",
+        f"{verified}Date of the shoot? *(e.g., 24 Nov 2025 or 24/11/2025)*",
         parse_mode="Markdown",
     )
     return BOOK_DATE
@@ -384,7 +2501,12 @@ async def book_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def book_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data["book_location"] = update.message.text.strip()
+    location = update.message.text.strip()
+    context.user_data["book_location"] = location
+    context.user_data["book_location_key"] = normalise_location(location)
+    context.user_data["book_place"] = resolve_location(
+        context.user_data["book_location_key"]
+    )
 
     buttons = [
         [
@@ -437,54 +2559,53 @@ async def lifestyle_hours(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Please send a valid number of hours (e.g. 1, 2, 3)."
         )
         return LIFESTYLE_HOURS
-
-    # Pricing: £150 if 1h, otherwise £100/h
-    if hours < 2:
-        base_price = 150
-    else:
-        base_price = hours * 100
+    if hours > MAX_SHOOT_HOURS:
+        await update.message.reply_text(
+            f"We can book up to {MAX_SHOOT_HOURS} hours in one go – for longer, "
+            "please send a shorter booking and message us about the rest."
+        )
+        return LIFESTYLE_HOURS
 
     d = date.fromisoformat(context.user_data["book_date"])
     t = time.fromisoformat(context.user_data["book_time"])
+    member = context.user_data.get("book_member", False)
+    quote = get_pricing().quote("lifestyle", hours, d, member)
     start_dt = datetime.combine(d, t)
     end_dt = start_dt + timedelta(hours=hours)
+    place = context.user_data.get("book_place")
+
+    block = BLACKOUTS.conflict(start_dt, end_dt)
+    if block:
+        await update.message.reply_text(blocked_message(block))
+        return ConversationHandler.END
 
     booking = {
         "user_id": user_id,
         "username": user.username,
         "name": context.user_data.get("book_name"),
         "instagram": context.user_data.get("book_ig"),
+        "member": member,
         "date": context.user_data.get("book_date_text"),
         "time": context.user_data.get("book_time_text"),
         "location": context.user_data.get("book_location"),
+        "location_key": context.user_data.get("book_location_key"),
+        "location_match": place["match"] if place else None,
+        "cluster": place["cluster"] if place else None,
+        "distance_miles": place["distance_miles"] if place else None,
+        "suggested_travel_fee": place["suggested_fee"] if place else None,
         "type": "lifestyle",
         "hours": hours,
         "players": None,
-        "base_price": base_price,
+        "base_price": quote["price"],
+        "peak": quote["peak"],
         "travel_fee": None,
         "start_dt": start_dt,
         "end_dt": end_dt,
         "status": "pending_travel",
     }
-    BOOKINGS[user_id] = booking
-
     # clash check vs confirmed + other pending
-    others = list(CONFIRMED_BOOKINGS) + [
-        b for uid, b in BOOKINGS.items() if uid != user_id
-    ]
-    spacing = check_time_spacing(start_dt, end_dt, others)
-
-    conflict_note = ""
-    if spacing["overlap"]:
-        conflict_note = (
-            "\n\n⚠️ _This time clashes with another booking._ "
-            "We'll confirm manually and may need to adjust your time."
-        )
-    elif spacing["close_gap"]:
-        conflict_note = (
-            "\n\n⚠️ _This is within 3 hours of another booking._ "
-            "We'll confirm manually and let you know if timing works."
-        )
+    spacing = add_pending_booking(booking)
+    conflict_note, clash_text = clash_notes(spacing)
 
     await update.message.reply_text(
         "Lifestyle Shoot – Summary\n"
@@ -494,7 +2615,7 @@ async def lifestyle_hours(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"• Time: {booking['time']}\n"
         f"• Location: {booking['location']}\n"
         f"• Hours: {booking['hours']}\n"
-        f"• Base shoot fee (no travel): £{booking['base_price']}\n\n"
+        f"• Base shoot fee (no travel): £{booking['base_price']}{peak_note(booking)}\n\n"
         "Travel fee depends on your location.\n"
         "We’ll confirm the travel fee and send you the *final total to pay* here."
         f"{conflict_note}",
@@ -504,12 +2625,6 @@ async def lifestyle_hours(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # notify admin
     if ADMIN_CHAT_ID:
         try:
-            clash_text = ""
-            if spacing["overlap"]:
-                clash_text = "CLASH: overlaps with another booking.\n"
-            elif spacing["close_gap"]:
-                clash_text = "NOTE: within 3 hours of another booking.\n"
-
             await context.bot.send_message(
                 chat_id=ADMIN_CHAT_ID,
                 text=(
@@ -517,18 +2632,21 @@ async def lifestyle_hours(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     f"From: @{user.username or user.full_name} (ID: {user_id})\n"
                     f"Name: {booking['name']}\n"
                     f"Instagram: {booking['instagram']}\n"
+                    f"{member_tag(booking)}"
                     f"Date: {booking['date']}\n"
                     f"Time: {booking['time']}\n"
                     f"Location: {booking['location']}\n"
+                    f"{travel_fee_hint(booking)}"
                     f"Hours: {booking['hours']}\n"
                     f"Base fee (no travel): £{booking['base_price']}\n"
+                    f"{resource_tag(booking)}"
                     f"{clash_text}"
                     "\nSet travel fee with:\n"
-                    f"/travel {user_id} <amount>"
+                    f"/travel {user_id} {travel_fee_arg(booking)}"
                 ),
             )
         except Exception as e:
-            logger.warning(f"Admin notify failed (lifestyle): {e}")
+            logger.warning("Admin notify failed (lifestyle): %s", e)
 
     return ConversationHandler.END
 
@@ -548,53 +2666,46 @@ async def matchday_players(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return MATCHDAY_PLAYERS
 
-    # Pricing: £300 for up to 3 players, else £100/player
-    if players <= 3:
-        base_price = 300
-    else:
-        base_price = players * 100
-
     d = date.fromisoformat(context.user_data["book_date"])
     t = time.fromisoformat(context.user_data["book_time"])
+    member = context.user_data.get("book_member", False)
+    quote = get_pricing().quote("matchday", players, d, member)
     start_dt = datetime.combine(d, t)
     # Assume matchday block is ~3h
     end_dt = start_dt + timedelta(hours=3)
+    place = context.user_data.get("book_place")
+
+    block = BLACKOUTS.conflict(start_dt, end_dt)
+    if block:
+        await update.message.reply_text(blocked_message(block))
+        return ConversationHandler.END
 
     booking = {
         "user_id": user_id,
         "username": user.username,
         "name": context.user_data.get("book_name"),
         "instagram": context.user_data.get("book_ig"),
+        "member": member,
         "date": context.user_data.get("book_date_text"),
         "time": context.user_data.get("book_time_text"),
         "location": context.user_data.get("book_location"),
+        "location_key": context.user_data.get("book_location_key"),
+        "location_match": place["match"] if place else None,
+        "cluster": place["cluster"] if place else None,
+        "distance_miles": place["distance_miles"] if place else None,
+        "suggested_travel_fee": place["suggested_fee"] if place else None,
         "type": "matchday",
         "hours": None,
         "players": players,
-        "base_price": base_price,
+        "base_price": quote["price"],
+        "peak": quote["peak"],
         "travel_fee": None,
         "start_dt": start_dt,
         "end_dt": end_dt,
         "status": "pending_travel",
     }
-    BOOKINGS[user_id] = booking
-
-    others = list(CONFIRMED_BOOKINGS) + [
-        b for uid, b in BOOKINGS.items() if uid != user_id
-    ]
-    spacing = check_time_spacing(start_dt, end_dt, others)
-
-    conflict_note = ""
-    if spacing["overlap"]:
-        conflict_note = (
-            "\n\n⚠️ _This time clashes with another booking._ "
-            "We'll confirm manually and may need to adjust your time."
-        )
-    elif spacing["close_gap"]:
-        conflict_note = (
-            "\n\n⚠️ _This is within 3 hours of another booking._ "
-            "We'll confirm manually and let you know if timing works."
-        )
+    spacing = add_pending_booking(booking)
+    conflict_note, clash_text = clash_notes(spacing)
 
     await update.message.reply_text(
         "Matchday Shoot – Summary\n"
@@ -604,7 +2715,7 @@ async def matchday_players(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"• Time: {booking['time']}\n"
         f"• Location: {booking['location']}\n"
         f"• Players: {booking['players']}\n"
-        f"• Base shoot fee (no travel): £{booking['base_price']}\n\n"
+        f"• Base shoot fee (no travel): £{booking['base_price']}{peak_note(booking)}\n\n"
         "Travel fee depends on your location.\n"
         "We’ll confirm the travel fee and send you the *final total to pay* here."
         f"{conflict_note}",
@@ -613,12 +2724,6 @@ async def matchday_players(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if ADMIN_CHAT_ID:
         try:
-            clash_text = ""
-            if spacing["overlap"]:
-                clash_text = "CLASH: overlaps with another booking.\n"
-            elif spacing["close_gap"]:
-                clash_text = "NOTE: within 3 hours of another booking.\n"
-
             await context.bot.send_message(
                 chat_id=ADMIN_CHAT_ID,
                 text=(
@@ -626,18 +2731,21 @@ async def matchday_players(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     f"From: @{user.username or user.full_name} (ID: {user_id})\n"
                     f"Name: {booking['name']}\n"
                     f"Instagram: {booking['instagram']}\n"
+                    f"{member_tag(booking)}"
                     f"Date: {booking['date']}\n"
                     f"Time: {booking['time']}\n"
                     f"Location: {booking['location']}\n"
+                    f"{travel_fee_hint(booking)}"
                     f"Players: {booking['players']}\n"
                     f"Base fee (no travel): £{booking['base_price']}\n"
+                    f"{resource_tag(booking)}"
                     f"{clash_text}"
                     "\nSet travel fee with:\n"
-                    f"/travel {user_id} <amount>"
+                    f"/travel {user_id} {travel_fee_arg(booking)}"
                 ),
             )
         except Exception as e:
-            logger.warning(f"Admin notify failed (matchday): {e}")
+            logger.warning("Admin notify failed (matchday): %s", e)
 
     return ConversationHandler.END
 
@@ -665,13 +2773,17 @@ async def set_travel_fee(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Both user_id and amount must be numbers.")
         return
 
-    booking = BOOKINGS.get(user_id)
+    # look the booking up inside the transaction: its pull may swap in a
+    # newer copy written by another worker (e.g. /reprice)
+    with shared_transaction():
+        booking = BOOKINGS.get(user_id)
+        if booking:
+            booking["travel_fee"] = travel_fee
+            booking["status"] = "awaiting_payment"
+            record_booking_write(booking)
     if not booking:
         await update.message.reply_text("No active booking found for that user.")
         return
-
-    booking["travel_fee"] = travel_fee
-    booking["status"] = "awaiting_payment"
     total = booking["base_price"] + travel_fee
 
     # Tell client final price + bank details
@@ -693,7 +2805,7 @@ async def set_travel_fee(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode="Markdown",
         )
     except Exception as e:
-        logger.warning(f"Failed to message client in /travel: {e}")
+        logger.warning("Failed to message client in /travel: %s", e, extra={"user_id": user_id})
         await update.message.reply_text("Could not message the client, but fee was set.")
         return
 
@@ -723,20 +2835,23 @@ async def confirm_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("user_id must be a number.")
         return
 
-    booking = BOOKINGS.get(user_id)
-    if not booking:
-        await update.message.reply_text("No active booking found for that user.")
-        return
-
-    if booking.get("travel_fee") is None:
-        await update.message.reply_text("Travel fee not set yet. Use /travel first.")
+    problem = None
+    with shared_transaction():
+        booking = BOOKINGS.get(user_id)
+        if not booking:
+            problem = "No active booking found for that user."
+        elif booking.get("travel_fee") is None:
+            problem = "Travel fee not set yet. Use /travel first."
+        else:
+            booking["status"] = "confirmed"
+            save_booking_to_csv(booking)
+            # remove from pending so only CONFIRMED_BOOKINGS hold it from now on
+            del BOOKINGS[user_id]
+            record_booking_write(booking)
+    if problem:
+        await update.message.reply_text(problem)
         return
 
-    booking["status"] = "confirmed"
-    save_booking_to_csv(booking)
-    # remove from pending so only CONFIRMED_BOOKINGS hold it from now on
-    del BOOKINGS[user_id]
-
     total = booking["base_price"] + (booking.get("travel_fee") or 0)
 
     # --- create ICS file for calendar (for admin only) ---
@@ -747,10 +2862,9 @@ async def confirm_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
             os.makedirs("data/ics", exist_ok=True)
             ics_filename = f"booking_{booking['user_id']}_{booking['start_dt'].strftime('%Y%m%dT%H%M%S')}.ics"
             ics_path = os.path.join("data", "ics", ics_filename)
-            with open(ics_path, "w", encoding="utf-8") as f:
-                f.write(ics_content)
+            write_atomic(ics_path, ics_content)
         except Exception as e:
-            logger.warning(f"Failed to write ICS file: {e}")
+            logger.warning("Failed to write ICS file: %s", e)
 
     # tell client – JUST TEXT, no ICS
     try:
@@ -768,7 +2882,7 @@ async def confirm_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode="Markdown",
         )
     except Exception as e:
-        logger.warning(f"Failed to message client in /confirm: {e}")
+        logger.warning("Failed to message client in /confirm: %s", e, extra={"user_id": user_id})
 
     # tell admin with text
     await update.message.reply_text(
@@ -791,7 +2905,7 @@ async def confirm_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     caption="Tap this to add the booking to your calendar 📅",
                 )
         except Exception as e:
-            logger.warning(f"Failed to send ICS to admin: {e}")
+            logger.warning("Failed to send ICS to admin: %s", e)
 
 
 
@@ -861,7 +2975,7 @@ async def export_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("You are not allowed to use this command.")
         return
 
-    file_path = "data/bookings.csv"
+    file_path = BOOKINGS_CSV
     if not os.path.exists(file_path):
         await update.message.reply_text("No bookings recorded yet.")
         return
@@ -875,50 +2989,391 @@ async def export_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
+async def find_bookings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: /find <query> – fuzzy search pending + historical bookings."""
+    if ADMIN_CHAT_ID is None or update.effective_chat.id != ADMIN_CHAT_ID:
+        await update.message.reply_text("You are not allowed to use this command.")
+        return
+
+    query = " ".join(context.args).strip()
+    if not query:
+        await update.message.reply_text("Use: /find <name, @instagram, username or location>")
+        return
+
+    note = ""
+    if SEARCH_INDEX.history is None:
+        # normally built by warm_up; a worker that skipped it builds it now
+        threading.Thread(target=load_search_history, daemon=True).start()
+        note = "\n\n(Booking history is still being indexed – only current bookings searched.)"
+
+    results = SEARCH_INDEX.search(query)
+    if not results:
+        await update.message.reply_text(f"No bookings match \"{query}\".{note}")
+        return
+
+    lines = [f"🔎 Results for \"{query}\":"]
+    for score, r in results:
+        lines.append(
+            f"• {r['name']} ({r['instagram'] or '-'}) – ID: {r['user_id'] or 'n/a'} – {r['status']}\n"
+            f"  {r['date']} {r['time'] or ''} · {r['location']} · {r['type']} · match {score:.0%}"
+        )
+    await update.message.reply_text("\n".join(lines) + note)
+
+
+async def assign_booking(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: /assign <user_id> <photographer_id> – override the auto-assignment."""
+    if ADMIN_CHAT_ID is None or update.effective_chat.id != ADMIN_CHAT_ID:
+        await update.message.reply_text("You are not allowed to use this command.")
+        return
+
+    if len(context.args) != 2:
+        ids = ", ".join(RESOURCES)
+        await update.message.reply_text(f"Use: /assign <user_id> <photographer_id>\nPhotographers: {ids}")
+        return
+
+    try:
+        user_id = int(context.args[0])
+    except ValueError:
+        await update.message.reply_text("user_id must be a number.")
+        return
+
+    res = RESOURCES.get(context.args[1])
+    if res is None:
+        ids = ", ".join(RESOURCES)
+        await update.message.reply_text(f"Unknown photographer. Choose one of: {ids}")
+        return
+
+    booking, spacing = move_booking(user_id, res)
+    if booking is None:
+        await update.message.reply_text("No active booking found for that user.")
+        return
+    _, clash_text = clash_notes(spacing)
+    await update.message.reply_text(
+        f"Booking for user {user_id} assigned to {res.name}.\n{clash_text}"
+    )
+
+
+async def block_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: /block [...] – list blocks, or add a one-off / recurring one."""
+    if ADMIN_CHAT_ID is None or update.effective_chat.id != ADMIN_CHAT_ID:
+        await update.message.reply_text("You are not allowed to use this command.")
+        return
+
+    if not context.args:
+        listing = "\n".join(describe_block(r) for r in BLACKOUTS.rules) or "No blocks set."
+        await update.message.reply_text(
+            f"{listing}\n\n"
+            "Add one with:\n"
+            "/block 2025-12-24 2025-12-27 Christmas\n"
+            "/block 2025-12-01T18:00 2025-12-01T23:00 Event\n"
+            "/block daily 00:00-09:00 No early shoots\n"
+            "/block weekly sun 00:00-23:59 Rest day"
+        )
+        return
+
+    try:
+        rule = parse_block_args(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"Couldn't read that block: {e}")
+        return
+
+    try:
+        rule = BLACKOUTS.add(rule)
+    except OSError as e:
+        logger.warning("Failed to save blocks file: %s", e)
+        await update.message.reply_text("Could not save the block.")
+        return
+    await update.message.reply_text(f"Blocked: {describe_block(rule)}")
+
+
+async def unblock_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: /unblock <id> – remove a block."""
+    if ADMIN_CHAT_ID is None or update.effective_chat.id != ADMIN_CHAT_ID:
+        await update.message.reply_text("You are not allowed to use this command.")
+        return
+
+    if len(context.args) != 1:
+        await update.message.reply_text("Use: /unblock <id> (see /block for ids)")
+        return
+
+    try:
+        rule_id = int(context.args[0].lstrip("#"))
+    except ValueError:
+        await update.message.reply_text("id must be a number.")
+        return
+
+    try:
+        removed = BLACKOUTS.remove(rule_id)
+    except OSError as e:
+        logger.warning("Failed to save blocks file: %s", e)
+        await update.message.reply_text("Could not save the change.")
+        return
+    if removed:
+        await update.message.reply_text(f"Block #{rule_id} removed.")
+    else:
+        await update.message.reply_text("No block with that id.")
+
+
+def reprice_pending(pricing: PricingTable):
+    """(booking, quote, suggested travel fee) for pending bookings whose prices changed."""
+    changes = []
+    for booking in list(BOOKINGS.values()):
+        try:
+            quote = quote_booking(booking, pricing)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue  # legacy / incomplete booking – leave it as it was
+        travel = booking.get("suggested_travel_fee")
+        if booking.get("distance_miles") is not None:
+            travel = pricing.travel_fee(booking["distance_miles"])
+        if (quote["price"], quote["peak"], travel) != (
+            booking["base_price"], booking.get("peak"), booking.get("suggested_travel_fee")
+        ):
+            changes.append((booking, quote, travel))
+    changes.sort(key=lambda c: c[0]["start_dt"])
+    return changes
+
+
+def describe_reprice(booking: dict, quote: dict, travel) -> str:
+    size = f"{booking['hours']}h" if booking["type"] == "lifestyle" else f"{booking['players']} players"
+    line = (
+        f"• {booking['user_id']} {booking['type']} {size} {booking.get('date')}: "
+        f"£{booking['base_price']} → £{quote['price']}"
+    )
+    if quote["peak"]:
+        line += f" ({quote['peak']})"
+    if travel != booking.get("suggested_travel_fee"):
+        line += f", travel hint £{booking.get('suggested_travel_fee')} → £{travel}"
+    return line
+
+
+def reprice_listing(changes: list, limit: int = 30) -> str:
+    listing = "\n".join(describe_reprice(*c) for c in changes[:limit])
+    if len(changes) > limit:
+        listing += f"\n…and {len(changes) - limit} more"
+    return listing
+
+
+async def reprice_bookings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: /reprice [apply] – re-quote pending bookings after a price change."""
+    if ADMIN_CHAT_ID is None or update.effective_chat.id != ADMIN_CHAT_ID:
+        await update.message.reply_text("You are not allowed to use this command.")
+        return
+
+    pricing = get_pricing()
+    apply = context.args[:1] == ["apply"]
+    if apply:
+        # re-quote and write in one store transaction, so a booking another
+        # worker changed meanwhile is re-read before it is repriced
+        repriced = []
+        with shared_transaction():
+            changes = reprice_pending(pricing)
+            listing = reprice_listing(changes)
+            for booking, quote, travel in changes:
+                old_price = booking["base_price"]
+                booking["base_price"] = quote["price"]
+                booking["peak"] = quote["peak"]
+                booking["suggested_travel_fee"] = travel
+                record_booking_write(booking)
+                if quote["price"] != old_price:
+                    repriced.append((booking, old_price))
+    else:
+        changes = reprice_pending(pricing)
+        listing = reprice_listing(changes)
+
+    if not changes:
+        await update.message.reply_text(
+            f"All {len(BOOKINGS)} pending bookings already match {PRICING_FILE}."
+        )
+        return
+
+    if not apply:
+        await update.message.reply_text(
+            f"Dry run – {len(changes)} of {len(BOOKINGS)} pending bookings would change:\n"
+            f"{listing}\n\n"
+            "Run /reprice apply to update them and tell the clients."
+        )
+        return
+
+    notified = 0
+    for booking, old_price in repriced:
+        text = (
+            f"Price update for your {booking['type']} shoot on {booking.get('date')}: "
+            f"shoot fee is now £{booking['base_price']}{peak_note(booking)} (was £{old_price})."
+        )
+        if booking.get("travel_fee") is not None:
+            total = booking["base_price"] + booking["travel_fee"]
+            text += f"\nNew total to pay: £{total}."
+        try:
+            await context.bot.send_message(chat_id=booking["user_id"], text=text)
+            notified += 1
+        except TelegramError as e:
+            logger.warning("Could not notify user %s of new price: %s", booking["user_id"], e)
+
+    await update.message.reply_text(
+        f"Updated {len(changes)} pending bookings ({notified} clients told their new price):\n{listing}"
+    )
+
+
 # ---------- APP SETUP ---------- #
 
-def build_app() -> Application:
+_FIRST_UPDATE_DONE = False
+
+
+def traced(callback, state: str = None):
+    """Wrap a handler so every update logs user, handler, state and latency."""
+
+    @functools.wraps(callback)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        global _FIRST_UPDATE_DONE
+        started = _time.perf_counter()
+        try:
+            sync_shared_state()
+            return await callback(update, context)
+        finally:
+            if not _FIRST_UPDATE_DONE:
+                _FIRST_UPDATE_DONE = True
+                logger.info("First update answered %.0fms after process start", process_uptime_ms())
+            user = update.effective_user if update else None
+            logger.info(
+                "handled %s",
+                callback.__name__,
+                extra={
+                    "user_id": user.id if user else None,
+                    "handler": callback.__name__,
+                    "state": state,
+                    "latency_ms": round((_time.perf_counter() - started) * 1000, 2),
+                    "sample": True,
+                },
+            )
+
+    return wrapper
+
+
+def warm_up():
+    """Load lookup tables so the first booking doesn't pay for them, then /find history."""
+    started = _time.perf_counter()
+    try:
+        get_gazetteer()
+        get_travel_times()
+        home_base()
+    except Exception as e:
+        logger.warning("Background warm-up failed: %s", e)
+    logger.info("Background warm-up done in %.1fms", (_time.perf_counter() - started) * 1000)
+    # /find is admin-only, so with workers only the admin's shard needs it
+    if ADMIN_CHAT_ID is not None and (WORKER_SHARD is None or ADMIN_CHAT_ID % BOT_WORKERS == WORKER_SHARD):
+        load_search_history()
+
+
+def log_startup_timings():
+    phases = [("interpreter", _INTERPRETER_MS)] + STARTUP_PHASES
+    logger.info(
+        "Startup %.0fms: %s",
+        process_uptime_ms(),
+        ", ".join(f"{name} {ms:.1f}ms" for name, ms in phases),
+    )
+
+
+async def on_startup(app: Application):
+    """Restore and verify state before the first update is processed."""
+    mark_startup_phase("app init")
+    if STORE is not None:
+        # worker: bookings come from the shared store (the ingress moved
+        # STATE_FILE into it on first start)
+        STORE.pull()
+        report = {"pending": len(BOOKINGS), "confirmed": len(CONFIRMED_BOOKINGS), "problems": []}
+    else:
+        report = load_state()
+    mark_startup_phase("restore state")
+    logger.info(
+        "Restored %d pending / %d confirmed bookings",
+        report["pending"],
+        report["confirmed"],
+    )
+    for problem in report["problems"]:
+        logger.warning("State check: %s", problem)
+    log_startup_timings()
+
+
+def flush_state():
+    try:
+        flushed = save_state()
+        logger.info(
+            "Shutdown flushed %d pending / %d confirmed bookings to %s",
+            flushed["pending"],
+            flushed["confirmed"],
+            STATE_FILE,
+        )
+    except Exception as e:
+        logger.error("Failed to flush state on shutdown: %s", e)
+
+
+async def on_shutdown(app: Application):
+    """Flush state atomically, report it, then drain the log queue."""
+    # workers' bookings already live in the shared store; the ingress
+    # writes STATE_FILE once they have all stopped
+    if STORE is None:
+        flush_state()
+    stop_logging()
+
+
+def build_app(updater: bool = True) -> Application:
+    """updater=False for workers, which get updates from the ingress instead."""
     if not TOKEN:
         raise RuntimeError("Missing TELEGRAM_TOKEN env var.")
 
-    app = Application.builder().token(TOKEN).build()
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(TELEGRAM_API_URL)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if not updater:
+        builder = builder.updater(None)
+    app = builder.build()
 
     # commands
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", help_cmd))
-    app.add_handler(CommandHandler("faqs", faqs))
-    app.add_handler(CommandHandler("travel", set_travel_fee))
-    app.add_handler(CommandHandler("confirm", confirm_payment))
-    app.add_handler(CommandHandler("export", export_data))
+    app.add_handler(CommandHandler("start", traced(start)))
+    app.add_handler(CommandHandler("help", traced(help_cmd)))
+    app.add_handler(CommandHandler("faqs", traced(faqs)))
+    app.add_handler(CommandHandler("travel", traced(set_travel_fee)))
+    app.add_handler(CommandHandler("confirm", traced(confirm_payment)))
+    app.add_handler(CommandHandler("export", traced(export_data)))
+    app.add_handler(CommandHandler("find", traced(find_bookings)))
+    app.add_handler(CommandHandler("assign", traced(assign_booking)))
+    app.add_handler(CommandHandler("block", traced(block_time)))
+    app.add_handler(CommandHandler("unblock", traced(unblock_time)))
+    app.add_handler(CommandHandler("reprice", traced(reprice_bookings)))
 
     # faq button
-    app.add_handler(CallbackQueryHandler(faqs, pattern="^faqs$"))
+    app.add_handler(CallbackQueryHandler(traced(faqs), pattern="^faqs$"))
 
     # booking conversation (handles /book and 📸 button)
     book_conv = ConversationHandler(
         entry_points=[
-            CommandHandler("book", book_entry),
-            CallbackQueryHandler(book_entry, pattern="^book_shoot$"),
+            CommandHandler("book", traced(book_entry)),
+            CallbackQueryHandler(traced(book_entry), pattern="^book_shoot$"),
         ],
         states={
-            BOOK_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_name)],
-            BOOK_IG: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_ig)],
-            BOOK_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_date)],
-            BOOK_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_time)],
-            BOOK_LOCATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, book_location)],
+            BOOK_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, traced(book_name, "BOOK_NAME"))],
+            BOOK_IG: [MessageHandler(filters.TEXT & ~filters.COMMAND, traced(book_ig, "BOOK_IG"))],
+            BOOK_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, traced(book_date, "BOOK_DATE"))],
+            BOOK_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, traced(book_time, "BOOK_TIME"))],
+            BOOK_LOCATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, traced(book_location, "BOOK_LOCATION"))],
             BOOK_TYPE: [
                 CallbackQueryHandler(
-                    book_type, pattern="^type_(lifestyle|matchday)$"
+                    traced(book_type, "BOOK_TYPE"),
+                    pattern="^type_(lifestyle|matchday)$",
                 )
             ],
             LIFESTYLE_HOURS: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, lifestyle_hours)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, traced(lifestyle_hours, "LIFESTYLE_HOURS"))
             ],
             MATCHDAY_PLAYERS: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, matchday_players)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, traced(matchday_players, "MATCHDAY_PLAYERS"))
             ],
         },
-        fallbacks=[CommandHandler("start", start)],
+        fallbacks=[CommandHandler("start", traced(start))],
         allow_reentry=True,
     )
     app.add_handler(book_conv)
@@ -927,16 +3382,208 @@ def build_app() -> Application:
     app.add_handler(
         MessageHandler(
             (filters.PHOTO | filters.Document.IMAGE) & ~filters.COMMAND,
-            handle_payment_proof,
+            traced(handle_payment_proof),
         )
     )
 
     return app
 
 
+# ---------- MULTI-PROCESS ---------- #
+
+# Admin commands whose first argument is the user_id they act on
+USER_TARGETED_COMMANDS = ("travel", "confirm", "assign")
+
+
+def shard_for(update: Update, workers: int) -> int:
+    """
+    Worker index for an update: the sender's, or for an admin command about
+    a user, that user's – so a booking is only ever changed by the worker
+    holding its conversation.
+    """
+    user_id = update.effective_user.id if update.effective_user else 0
+    chat = update.effective_chat
+    msg = update.effective_message
+    text = (msg.text or "") if msg else ""
+    if chat and chat.id == ADMIN_CHAT_ID and text.startswith("/"):
+        parts = text.split()
+        command = parts[0][1:].split("@")[0].lower()
+        if command in USER_TARGETED_COMMANDS and len(parts) > 1 and parts[1].isdigit():
+            user_id = int(parts[1])
+    return user_id % workers
+
+
+async def _spawn_worker(shard: int):
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        os.path.abspath(__file__),
+        stdin=asyncio.subprocess.PIPE,
+        env={**os.environ, "BOT_SHARD": str(shard)},
+    )
+
+
+async def _send_to_worker(workers: list, shard: int, line: bytes):
+    """Write one update to a worker, restarting it if it has died."""
+    for _ in range(2):
+        proc = workers[shard]
+        if proc.returncode is not None:
+            logger.error("Worker %d exited with %s, restarting", shard, proc.returncode)
+            proc = workers[shard] = await _spawn_worker(shard)
+        try:
+            proc.stdin.write(line)
+            await proc.stdin.drain()
+            return
+        except (BrokenPipeError, ConnectionResetError):
+            await proc.wait()
+    logger.error("Dropped an update for worker %d", shard)
+
+
+async def run_ingress(count: int):
+    """Poll Telegram and hand each update to its worker as one JSON line."""
+    if not TOKEN:
+        raise RuntimeError("Missing TELEGRAM_TOKEN env var.")
+
+    compacted = STORE.compact()
+    if STORE.is_empty():
+        # first start in this mode: move STATE_FILE into the store
+        report = load_state()
+        for problem in report["problems"]:
+            logger.warning("State check: %s", problem)
+        logger.info(
+            "Moved %d pending / %d confirmed bookings into %s",
+            report["pending"],
+            report["confirmed"],
+            STORE_FILE,
+        )
+    logger.info("Starting %d workers (%d old store rows dropped)", count, compacted)
+    workers = [await _spawn_worker(shard) for shard in range(count)]
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    stop_waiter = asyncio.ensure_future(stopping.wait())
+
+    offset = None
+    async with Bot(TOKEN, base_url=TELEGRAM_API_URL) as bot:
+        await bot.delete_webhook()
+        while not stopping.is_set():
+            poll = asyncio.ensure_future(
+                bot.get_updates(offset=offset, timeout=25, allowed_updates=Update.ALL_TYPES)
+            )
+            await asyncio.wait({poll, stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if not poll.done():
+                poll.cancel()
+                break
+            try:
+                updates = poll.result()
+            except TelegramError as e:
+                logger.warning("getUpdates failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                line = json.dumps(update.to_dict()).encode() + b"\n"
+                await _send_to_worker(workers, shard_for(update, count), line)
+        if offset is not None:
+            # acknowledge the last batch so a restart doesn't replay it
+            try:
+                await bot.get_updates(offset=offset, timeout=0)
+            except TelegramError as e:
+                logger.warning("Could not acknowledge last updates: %s", e)
+
+    # closing stdin tells a worker to finish its queue and shut down
+    for proc in workers:
+        proc.stdin.close()
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(proc.wait() for proc in workers)),
+            SHUTDOWN_DEADLINE_SECONDS + 5,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Workers still running after the shutdown deadline, killing them")
+        for proc in workers:
+            if proc.returncode is None:
+                proc.kill()
+    sync_shared_state()
+    flush_state()
+    stop_logging()
+
+
+async def stop_app(app: Application):
+    """
+    Stop app, giving queued updates and running handlers
+    SHUTDOWN_DEADLINE_SECONDS; then shut down, which flushes state even if
+    a handler is still hung (Application.stop() alone waits forever).
+    """
+    if app.running:
+        try:
+            await asyncio.wait_for(app.stop(), SHUTDOWN_DEADLINE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Handlers still running after %.0fs, shutting down anyway", SHUTDOWN_DEADLINE_SECONDS
+            )
+    try:
+        await app.shutdown()
+    finally:
+        await app.post_shutdown(app)
+
+
+async def run_polling(app: Application):
+    """Application.run_polling's lifecycle, with a deadline on stopping."""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    try:
+        await app.initialize()
+        await app.post_init(app)
+        await app.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        await app.start()
+        await stopping.wait()
+    finally:
+        if app.updater.running:
+            await app.updater.stop()
+        await stop_app(app)
+
+
+async def run_worker(app: Application):
+    """Feed update JSON lines from stdin to app until the ingress closes it."""
+    # the ingress handles SIGINT/SIGTERM and closes stdin to stop us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=2**22)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    # the lifecycle run_polling goes through, minus fetching updates
+    await app.initialize()
+    await app.post_init(app)
+    await app.start()
+    while line := await reader.readline():
+        await app.update_queue.put(Update.de_json(json.loads(line), app.bot))
+    await stop_app(app)
+
+
+mark_startup_phase("module setup")
+
+
 def main():
-    app = build_app()
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WORKER_SHARD is None and BOT_WORKERS > 1:
+        asyncio.run(run_ingress(BOT_WORKERS))
+        return
+
+    app = build_app(updater=WORKER_SHARD is None)
+    mark_startup_phase("build app")
+    # lookups and the member list load while polling starts up; handlers
+    # that get there first just load what they need themselves
+    threading.Thread(target=warm_up, daemon=True).start()
+    start_member_watcher()
+    if WORKER_SHARD is not None:
+        asyncio.run(run_worker(app))
+        return
+    # polls until SIGTERM/SIGINT, then stops within SHUTDOWN_DEADLINE_SECONDS
+    asyncio.run(run_polling(app))
 
 
 if __name__ == "__main__":